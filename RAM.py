@@ -5,9 +5,59 @@
 # Date : 3rd March 2022
 #
 
+import collections
+import copy
+import hashlib
+import io
+import mmap
+import os
+import re
+import struct
 import sys
+import threading
+import time
+import zlib
+from array import array
+
+# NumPy is imported by importNumpy only when the vectorized engine is used,
+# because importing it takes longer than most runs of the simulator
+numpy = None
 
 keys = ['READ', 'STORE', 'LOAD', 'ADD', 'SUB', 'HALF', 'JUMP', 'JPOS', 'JZERO', 'JNEG', 'HALT', 'PASS']
+number = re.compile(r'\d+')
+word = re.compile(r'[^\W\d_]+')
+statement = re.compile(r'(?:([A-Za-z]+)(?: (=?)(\d+))?(?: #.*| )?|([A-Za-z]+) \((\d+)\)(?:#.*)?|#.*)?\n')
+
+class RAMError(Exception):
+    kind = None
+
+    def __init__(self, linenum, message):
+        location = "Error" if linenum == None else "Error on line " + str(linenum)
+        Exception.__init__(self, location + " : " + (self.kind + ". " if self.kind else "") + message)
+        self.linenum = linenum
+        self.message = message
+
+class InputError(RAMError):
+    pass
+
+class ScanError(RAMError):
+    kind = "Scanner error"
+
+class ParseError(RAMError):
+    kind = "Parse error"
+
+class ExecutionError(RAMError):
+    kind = "Runtime error"
+
+class ValidationError(RAMError):
+    kind = "Validation error"
+
+class LimitError(RAMError):
+    kind = "Limit exceeded"
+
+    def __init__(self, linenum, message, status):
+        RAMError.__init__(self, linenum, message)
+        self.status = status
 
 class Token():
     def __init__(self):
@@ -16,30 +66,73 @@ class Token():
         self.linenum = None
 
 class Instruction():
+    __slots__ = ("instruction", "type", "arg", "linenum", "steps")
+
     def __init__(self):
         self.instruction = None
         self.type = None
         self.arg = None
         self.linenum = None
+        self.steps = 1
+
+    def __str__(self):
+        if(self.type == "direct"):
+            return self.instruction + " " + str(self.arg)
+        elif(self.type == "indirect"):
+            return self.instruction + " (" + str(self.arg) + ")"
+        elif(self.type == "constant"):
+            return self.instruction + " =" + str(self.arg)
+        elif(self.arg != None):
+            return self.instruction + " " + str(self.arg)
+        return self.instruction
+
+class Superinstruction():
+    def __init__(self, name, parts, next):
+        self.instruction = "FUSED"
+        self.name = name
+        self.parts = parts
+        self.linenum = parts[0].linenum
+        self.steps = len(parts)
+        self.saved = len(parts) - 1
+        self.next = next
+        self.load = None
+        self.op = None
+        self.store = None
+        self.jump = None
 
 class Scanner():
-    def __init__(self):
+    def __init__(self, source = None, path = None):
+        self.source = source
+        self.path = path
         self.line = None
+        self.pos = 0
         self.genline = None
         self.end = False
         self.token = None
         self.linenum = 0
 
+    def lines(self):
+        if(self.path != None):
+            with open(self.path) as f:
+                yield from f
+        elif(self.source == None):
+            yield from sys.stdin
+        elif(isinstance(self.source, str)):
+            yield from io.StringIO(self.source)
+        else:
+            yield from self.source
+
     def generator(self):
-        for line in sys.stdin:
+        for line in self.lines():
             self.linenum += 1
-            yield list(line) if list(line)[-1] == '\n' else list(line) + ['\n']   
+            yield line if line[-1] == '\n' else line + '\n'
  
     def nextline(self):
         try:
             if(self.genline == None):
                 self.genline = self.generator()
             self.line = next(self.genline)
+            self.pos = 0
         except StopIteration:
             self.end = True
 
@@ -75,112 +168,132 @@ class Scanner():
         return suggestion
 
     def scan(self):
-        if(not self.line):
+        if(not self.line or self.pos == len(self.line)):
             self.nextline()
         if(self.end):
             return None
         self.token = Token()
         self.token.linenum = self.linenum
-        char = ''
-        while True:
-            char = self.line.pop(0)
-            if(char == '#'):
-                char = '\n'
-                self.line = []
-            if(char == '('):
-                self.token.type = '('
+        line = self.line
+        char = line[self.pos]
+        if(char in "()="):
+            self.token.type = char
+            self.pos += 1
+            return self.token
+        if(char == '\n' or char == '#'):
+            self.token.type = 'newline'
+            self.pos = len(line)
+            return self.token
+        if(char.isdecimal()):
+            match = number.match(line, self.pos)
+            self.token.type = 'num'
+            self.token.value = match.group()
+            self.pos = match.end()
+            char = line[self.pos]
+            if(char == ' '):
+                self.pos += 1
                 return self.token
-            if(char == ')'):
-                self.token.type = ')'
-                return self.token
-            if(char == '='):
-                self.token.type = '='
+            if(char == '\n' or char == ')'):
                 return self.token
+            raise ScanError(self.linenum, "Not a valid number : " + self.token.value + char)
+        if(char.isalpha()):
+            match = word.match(line, self.pos)
+            self.token.type = 'keyword'
+            self.token.value = match.group()
+            self.pos = match.end()
+            char = line[self.pos]
             if(char == '\n'):
-                self.token.type = 'newline'
+                if(self.token.value.upper() in keys):
+                    self.token.value = self.token.value.upper()
                 return self.token
-            if(char.isnumeric()):
-                self.token.type = 'num'
-                self.token.value = char
-                while True:
-                    char = self.line.pop(0)
-                    if(char.isnumeric()):
-                        self.token.value = self.token.value + char
-                    elif(char == ' '):
-                        return self.token
-                    elif(char == '\n'):
-                        self.line.insert(0, char)
-                        return self.token
-                    elif(char == ')'):
-                        self.line.insert(0, char)
-                        return self.token                            
-                    else:
-                        print("Error on line " + str(self.linenum) + " : Scanner error. Not a valid number : " + self.token.value + char)
-                        exit(1)
-            if(char.isalpha()):
-                self.token.type = 'keyword'
-                self.token.value = char
-                while True:
-                    char = self.line.pop(0)
-                    if(char.isalpha()):
-                        self.token.value = self.token.value + char
-                    elif(char == ' '):
-                        if(self.token.value.upper() in keys):
-                            self.token.value = self.token.value.upper()
-                            return self.token
-                        print("Error on line " + str(self.linenum) + " : Scanner error. Unknown instruction : " + self.token.value + "." + self.getSuggestion(self.token.value.upper()))
-                        exit(1)
-                    elif(char == '\n'):
-                        self.line.insert(0, char)
-                        return self.token
-                    else:
-                        print("Error on line " + str(self.linenum) + " : Scanner error. Not a valid instruction : " + self.token.value + char + "." + self.getSuggestion(self.token.value.upper()))
-                        exit(1)
-            else:
-                print("Error on line " + str(self.linenum) + " : Scanner error. Invalid symbol : " + char)
-                exit(1)
-            
+            if(char == ' '):
+                if(self.token.value.upper() in keys):
+                    self.token.value = self.token.value.upper()
+                    self.pos += 1
+                    return self.token
+                raise ScanError(self.linenum, "Unknown instruction : " + self.token.value + "." + self.getSuggestion(self.token.value.upper()))
+            raise ScanError(self.linenum, "Not a valid instruction : " + self.token.value + char + "." + self.getSuggestion(self.token.value.upper()))
+        raise ScanError(self.linenum, "Invalid symbol : " + char)
+
 
 class Parser():
 
-    def __init__(self):
-        self.scanner = Scanner()
+    def __init__(self, source = None, path = None):
+        self.scanner = Scanner(source, path)
         self.instructions = [None]
 
     def getCode(self):
         while True:
-            tkn = self.scanner.scan()
-            if(tkn == None):
+            self.scanner.nextline()
+            if(self.scanner.end):
                 return self.instructions
-            elif(tkn.type == "newline"):
-                instruction = Instruction()
-                instruction.instruction = "PASS"
-                instruction.linenum = tkn.linenum
-                self.instructions.append(instruction)
-            elif(tkn.type == "keyword"):
-                instruction = Instruction()
-                instruction.instruction = tkn.value
-                instruction.linenum = tkn.linenum
-                if(tkn.value in ["READ", "STORE"]):
-                    instruction = self.argDirIndir(instruction)
-                elif(tkn.value in ["JUMP", "JPOS", "JZERO", "JNEG"]):
-                    instruction = self.argConst(instruction)
-                elif(tkn.value in ["LOAD", "ADD", "SUB"]):
-                    instruction = self.argDirIndirConst(instruction)
-                self.instructions.append(instruction)
-                tkn = self.scanner.scan()
-                if(tkn.type != "newline"):
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Multiple instructions in one line detected : " + str(tkn.value))
-                    exit(1)
-            else:
-                print("Error on line " + str(tkn.linenum) + " : Parse error. Too much arguments or no instruction name : " + str(tkn.value))
-                exit(1)
+            if(not self.matchLine()):
+                self.parseLine()
+
+    def matchLine(self):
+        match = statement.fullmatch(self.scanner.line)
+        if(match == None):
+            return False
+        instruction = Instruction()
+        instruction.linenum = self.scanner.linenum
+        name = match.group(1) or match.group(4)
+        if(name == None):
+            instruction.instruction = "PASS"
+            self.instructions.append(instruction)
+            return True
+        name = name.upper()
+        if(match.group(4)):
+            if(name not in ["READ", "STORE", "LOAD", "ADD", "SUB"]):
+                return False
+            instruction.type = "indirect"
+            instruction.arg = int(match.group(5))
+        elif(match.group(2)):
+            if(name not in ["JUMP", "JPOS", "JZERO", "JNEG", "LOAD", "ADD", "SUB"]):
+                return False
+            instruction.type = "constant"
+            instruction.arg = int(match.group(3))
+        elif(match.group(3)):
+            if(name in ["READ", "STORE", "LOAD", "ADD", "SUB"]):
+                instruction.type = "direct"
+            elif(name not in ["JUMP", "JPOS", "JZERO", "JNEG"]):
+                return False
+            instruction.arg = int(match.group(3))
+        elif(name not in ["HALT", "HALF", "PASS"]):
+            return False
+        instruction.instruction = name
+        self.instructions.append(instruction)
+        return True
+
+    def parseLine(self):
+        tkn = self.scanner.scan()
+        if(tkn.type == "newline"):
+            instruction = Instruction()
+            instruction.instruction = "PASS"
+            instruction.linenum = tkn.linenum
+            self.instructions.append(instruction)
+        elif(tkn.type == "keyword"):
+            if(tkn.value not in keys):
+                raise ScanError(tkn.linenum, "Unknown instruction : " + tkn.value + "." + self.scanner.getSuggestion(tkn.value.upper()))
+            instruction = Instruction()
+            instruction.instruction = tkn.value
+            instruction.linenum = tkn.linenum
+            if(tkn.value in ["READ", "STORE"]):
+                instruction = self.argDirIndir(instruction)
+            elif(tkn.value in ["JUMP", "JPOS", "JZERO", "JNEG"]):
+                instruction = self.argConst(instruction)
+            elif(tkn.value in ["LOAD", "ADD", "SUB"]):
+                instruction = self.argDirIndirConst(instruction)
+            self.instructions.append(instruction)
+            tkn = self.scanner.scan()
+            if(tkn.type != "newline"):
+                raise ParseError(tkn.linenum, "Multiple instructions in one line detected : " + str(tkn.value))
+        else:
+            raise ParseError(tkn.linenum, "Too much arguments or no instruction name : " + str(tkn.value))
 
     def argDirIndir(self, instruction):
             tkn = self.scanner.scan()
             if(tkn == None):
-                print("Error on the last instruction : Parse error. Incomplete instruction: " + instruction.instruction)
-                exit(1)
+                raise ParseError(self.scanner.linenum, "Incomplete instruction : " + instruction.instruction)
             elif(tkn.type == "num"):
                 instruction.type = "direct"
                 instruction.arg = int(tkn.value)
@@ -191,22 +304,18 @@ class Parser():
                 if(tkn.type == "num"):                
                     instruction.arg = int(tkn.value)
                 else:
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Non-numeric token after '(' : " + tkn.value)
-                    exit(1)
+                    raise ParseError(tkn.linenum, "Non-numeric token after '(' : " + str(tkn.value))
                 tkn = self.scanner.scan()
                 if(tkn.type == ')'):
                     return instruction
                 else:
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Missing ')'")
-                    exit(1)
-            print("Error on line " + str(tkn.linenum) + " : Parse error. Incomplete instruction : " + instruction.instruction)
-            exit(1)
+                    raise ParseError(tkn.linenum, "Missing ')'")
+            raise ParseError(tkn.linenum, "Incomplete instruction : " + instruction.instruction)
 
     def argConst(self, instruction):
             tkn = self.scanner.scan()
             if(tkn == None):
-                print("Error on the last instruction : Parse error. Incomplete instruction: " + instruction.instruction)
-                exit(1)
+                raise ParseError(self.scanner.linenum, "Incomplete instruction : " + instruction.instruction)
             elif(tkn.type == "="):
                 instruction.type = "constant"
                 tkn = self.scanner.scan()
@@ -214,21 +323,18 @@ class Parser():
                     instruction.arg = int(tkn.value)
                     return instruction
                 else:
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Expected a numeric value after a token '=' : " + instruction.instruction)
-                    exit(1)
+                    raise ParseError(tkn.linenum, "Expected a numeric value after a token '=' : " + instruction.instruction)
             elif(tkn.type == "num"):
                 instruction.arg = int(tkn.value)
                 return instruction
 
             else:
-                print("Error on line " + str(tkn.linenum) + " : Parse error. A token '=' was expected in front of a constant after a instruction : " + instruction.instruction)
-                exit(1)
+                raise ParseError(tkn.linenum, "A token '=' was expected in front of a constant after a instruction : " + instruction.instruction)
 
     def argDirIndirConst(self, instruction):
             tkn = self.scanner.scan()
             if(tkn == None):
-                print("Error on the last instruction : Parse error. Incomplete instruction: " + instruction.instruction)
-                exit(1)
+                raise ParseError(self.scanner.linenum, "Incomplete instruction : " + instruction.instruction)
             elif(tkn.type == "num"):
                 instruction.type = "direct"
                 instruction.arg = int(tkn.value)
@@ -239,8 +345,7 @@ class Parser():
                 if(tkn.type == "num"):                
                     instruction.arg = int(tkn.value)
                 else:
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Non-numeric token after '(' : " + tkn.value)
-                    exit(1)
+                    raise ParseError(tkn.linenum, "Non-numeric token after '(' : " + str(tkn.value))
                 tkn = self.scanner.scan()
                 if(tkn.type == ')'):
                     return instruction
@@ -251,36 +356,630 @@ class Parser():
                     instruction.arg = int(tkn.value)
                     return instruction
                 else:
-                    print("Error on line " + str(tkn.linenum) + " : Parse error. Expected a numeric value after a token '=' : " + instruction.instruction)
-                    exit(1)
-            print("Error on line " + str(tkn.linenum) + " : Parse error. Incomplete instruction : " + instruction.instruction)
-            exit(1)
+                    raise ParseError(tkn.linenum, "Expected a numeric value after a token '=' : " + instruction.instruction)
+            raise ParseError(tkn.linenum, "Incomplete instruction : " + instruction.instruction)
 
 
-class RAM():
-    def __init__(self, prog, inp):
-        self.inp = inp
+class Block():
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.successors = []
+        self.predecessors = []
+
+    def __len__(self):
+        return self.end - self.start + 1
+
+
+class ControlFlowGraph():
+    def __init__(self, prog):
         self.prog = prog
-        self.reg = {0 : 0}
+        self.blocks = {}
+        self.reachable = set()
+        self.reads = None
+        leaders = set([1]) if len(prog) > 1 else set()
+        for pc in range(1, len(prog)):
+            instruction = prog[pc]
+            if(instruction.instruction in ["JUMP", "JPOS", "JZERO", "JNEG"]):
+                if(0 < instruction.arg < len(prog)):
+                    leaders.add(instruction.arg)
+                leaders.add(pc + 1)
+            elif(instruction.instruction == "HALT"):
+                leaders.add(pc + 1)
+        leaders.discard(len(prog))
+        leaders = sorted(leaders)
+        for i in range(len(leaders)):
+            end = leaders[i + 1] - 1 if i + 1 < len(leaders) else len(prog) - 1
+            self.blocks[leaders[i]] = Block(leaders[i], end)
+        for block in self.blocks.values():
+            instruction = prog[block.end]
+            following = block.end + 1 if block.end + 1 < len(prog) else 0
+            if(instruction.instruction == "HALT"):
+                block.successors = [0]
+            elif(instruction.instruction == "JUMP"):
+                block.successors = [instruction.arg]
+            elif(instruction.instruction in ["JPOS", "JZERO", "JNEG"]):
+                block.successors = [instruction.arg] if instruction.arg == following else [instruction.arg, following]
+            else:
+                block.successors = [following]
+        stack = [1] if self.blocks else []
+        while(stack):
+            start = stack.pop()
+            if(start in self.reachable):
+                continue
+            self.reachable.add(start)
+            for successor in self.blocks[start].successors:
+                if(successor in self.blocks):
+                    self.blocks[successor].predecessors.append(start)
+                    stack.append(successor)
+
+    def verify(self):
+        for start in sorted(self.reachable):
+            block = self.blocks[start]
+            for pc in range(block.start, block.end + 1):
+                instruction = self.prog[pc]
+                if(instruction.instruction in ["JUMP", "JPOS", "JZERO", "JNEG"] and instruction.arg > len(self.prog) - 1):
+                    raise ValidationError(instruction.linenum, "Invalid jump. There is no line " + str(instruction.arg) + " in the code. Instruction : " + instruction.instruction)
+                if(instruction.instruction == "READ" and instruction.type == "direct"):
+                    if(instruction.arg < 1):
+                        raise ValidationError(instruction.linenum, "It is not possible to read from the input register 0. There is no such an input register. Instruction : READ")
+                    if(self.reads == None or self.reads.arg < instruction.arg):
+                        self.reads = instruction
+        return self
+
+    def checkInputs(self, inp):
+        if(self.reads != None and len(inp) < self.reads.arg):
+            raise ValidationError(self.reads.linenum, "It is not possible to read from the input register " + str(self.reads.arg) + ". There is no such an input register. Instruction : READ")
+
+    def unreachable(self):
+        lines = []
+        for block in self.blocks.values():
+            if(block.start not in self.reachable):
+                lines += [pc for pc in range(block.start, block.end + 1) if self.prog[pc].instruction != "PASS"]
+        return lines
+
+    def describe(self):
+        lines = []
+        for block in self.blocks.values():
+            successors = ", ".join("end" if successor == 0 else str(successor) for successor in block.successors)
+            lines.append("Block " + str(block.start) + "-" + str(block.end) + " : successors " + successors + ("" if block.start in self.reachable else " (unreachable)"))
+        unreachable = self.unreachable()
+        if(unreachable):
+            lines.append("Unreachable lines : " + ", ".join(str(line) for line in unreachable))
+        return lines
+
+    def loops(self):
+        loops = {}
+        for block in self.blocks.values():
+            for successor in block.successors:
+                if(0 < successor <= block.end):
+                    loops[successor] = max(loops.get(successor, 0), block.end)
+        return loops
+
+
+class Optimizer():
+    patterns = [
+        ("UPDATEJUMP", [["LOAD"], ["ADD", "SUB"], ["STORE"], ["JUMP"]]),
+        ("TEST", [["LOAD"], ["ADD", "SUB"], ["JPOS", "JZERO", "JNEG"]]),
+        ("UPDATE", [["LOAD"], ["ADD", "SUB"], ["STORE"]]),
+        ("LOADTEST", [["LOAD"], ["JPOS", "JZERO", "JNEG"]]),
+        ("MOVE", [["LOAD"], ["STORE"]]),
+        ("OPTEST", [["ADD", "SUB"], ["JPOS", "JZERO", "JNEG"]]),
+        ("OPSTOREJUMP", [["ADD", "SUB"], ["STORE"], ["JUMP"]]),
+        ("OPSTORE", [["ADD", "SUB"], ["STORE"]]),
+    ]
+
+    def __init__(self, program):
+        self.code = program.code
+
+    def match(self, start):
+        pc = start
+        while(self.code[pc].instruction == "PASS"):
+            pc += 1
+        for (name, pattern) in self.patterns:
+            if(pc + len(pattern) < len(self.code) and all(self.code[pc + i].instruction in pattern[i] for i in range(len(pattern)))):
+                fused = Superinstruction(name, self.code[start:pc + len(pattern)], pc + len(pattern))
+                for instruction in fused.parts[pc - start:]:
+                    if(instruction.instruction == "LOAD"):
+                        fused.load = instruction
+                    elif(instruction.instruction == "STORE"):
+                        fused.store = instruction
+                    elif(instruction.instruction in ["ADD", "SUB"]):
+                        fused.op = instruction
+                    else:
+                        fused.jump = instruction
+                return fused
+        if(pc == start):
+            return self.code[start]
+        return Superinstruction("SKIP", self.code[start:pc], pc)
+
+    def optimize(self):
+        return [None] + [self.match(pc) for pc in range(1, len(self.code) - 1)] + [self.code[-1]]
+
+
+# A loop summary describes a loop which runs along a single path of blocks with
+# a single exit test. Register values are tracked as linear forms, i.e. dicts
+# mapping a register (or -X for the input register X, or None for a constant)
+# to its coefficient, in terms of the register values at the start of an
+# iteration. A register which changes by the same amount in every iteration is
+# an induction register; a register which is overwritten from the induction and
+# unchanged registers is derived. The tested value then grows linearly with the
+# iteration, so the number of iterations can be computed directly.
+
+class Loop():
+    def __init__(self, header, length, prefix, exit, condition):
+        self.header = header
+        self.length = length
+        self.prefix = prefix
+        self.exit = exit
+        self.condition = condition
+        self.test = None
+        self.inductions = {}
+        self.derived = {}
+        self.effects = {}
+        self.registers = set()
+
+    def value(self, form, values, inp):
+        total = form.get(None, 0)
+        for (symbol, coefficient) in form.items():
+            if(symbol != None):
+                total += coefficient * (values[symbol] if symbol >= 0 else inp[-symbol - 1])
+        return total
+
+    def count(self, first, change):
+        if(self.condition == "neg"):
+            return 0 if first < 0 else (first // -change + 1 if change < 0 else None)
+        if(self.condition == "pos"):
+            return 0 if first > 0 else (-first // change + 1 if change > 0 else None)
+        if(self.condition == "notneg"):
+            return 0 if first >= 0 else ((change - first - 1) // change if change > 0 else None)
+        if(self.condition == "notpos"):
+            return 0 if first <= 0 else ((first - change - 1) // -change if change < 0 else None)
+        if(self.condition == "zero"):
+            if(first == 0):
+                return 0
+            return -first // change if change != 0 and first % change == 0 and -first // change > 0 else None
+        return 0 if first != 0 else (1 if change != 0 else None)
+
+    def iterate(self, start, increments, count, inp):
+        values = dict(start)
+        if(count > 0):
+            previous = dict(start)
+            for (register, increment) in increments.items():
+                previous[register] = start[register] + (count - 1) * increment
+                values[register] = previous[register] + increment
+            for (register, form) in self.derived.items():
+                values[register] = self.value(form, previous, inp)
+        return values
+
+    def iterations(self, reg, inp):
+        start = {register : reg.get(register, 0) for register in self.registers}
+        increments = {register : self.value(increment, start, inp) for (register, increment) in self.inductions.items()}
+        first = self.value(self.test, start, inp)
+        change = sum(coefficient * increments[symbol] for (symbol, coefficient) in self.test.items() if symbol in increments)
+        return (start, increments, self.count(first, change))
+
+    def skip(self, reg, inp, budget = None):
+        (start, increments, count) = self.iterations(reg, inp)
+        if(count != None and (budget == None or count * self.length + self.prefix <= budget)):
+            values = self.iterate(start, increments, count, inp)
+            final = {register : self.value(form, values, inp) for (register, form) in self.effects.items()}
+            if(count > 0):
+                for register in list(self.inductions) + list(self.derived):
+                    reg[register] = values[register]
+            for (register, value) in final.items():
+                reg[register] = value
+            return (self.exit, count * self.length + self.prefix)
+        if(budget == None or budget < self.length):
+            return None
+        count = budget // self.length if count == None else min(count, budget // self.length)
+        values = self.iterate(start, increments, count, inp)
+        for register in list(self.inductions) + list(self.derived):
+            reg[register] = values[register]
+        return (self.header, count * self.length)
+
+
+class LoopSummarizer():
+    conditions = {"JPOS" : ("pos", "notpos"), "JZERO" : ("zero", "nonzero"), "JNEG" : ("neg", "notneg")}
+
+    def __init__(self, program):
+        self.code = program.code
+        self.graph = program.graph
+
+    def returns(self, start, header):
+        seen = set()
+        while(start in self.graph.blocks and start not in seen):
+            if(start == header):
+                return True
+            seen.add(start)
+            block = self.graph.blocks[start]
+            if(len(block.successors) != 1):
+                return False
+            start = block.successors[0]
+        return False
+
+    def path(self, header):
+        pcs = []
+        prefix = None
+        start = header
+        while(True):
+            block = self.graph.blocks[start]
+            pcs += range(block.start, block.end + 1)
+            if(len(block.successors) == 2):
+                if(prefix != None):
+                    return None
+                (target, following) = block.successors
+                back = self.returns(target, header)
+                if(back == self.returns(following, header)):
+                    return None
+                prefix = len(pcs)
+                conditions = self.conditions[self.code[block.end].instruction]
+                (start, exit, condition) = (target, following, conditions[1]) if back else (following, target, conditions[0])
+            else:
+                start = block.successors[0]
+            if(start == header):
+                break
+            if(start not in self.graph.blocks or len(pcs) > len(self.code)):
+                return None
+        if(prefix == None):
+            return None
+        return (pcs, prefix, exit, condition)
+
+    def combine(self, first, second, sign):
+        form = dict(first)
+        for (symbol, coefficient) in second.items():
+            form[symbol] = form.get(symbol, 0) + sign * coefficient
+            if(form[symbol] == 0):
+                del form[symbol]
+        return form
+
+    def operand(self, state, instruction):
+        if(instruction.type == "constant"):
+            return {None : instruction.arg} if instruction.arg else {}
+        return state.get(instruction.arg, {instruction.arg : 1})
+
+    def loop(self, header):
+        path = self.path(header)
+        if(path == None):
+            return None
+        (pcs, prefix, exit, condition) = path
+        loop = Loop(header, len(pcs), prefix, exit, condition)
+        state = {}
+        for i in range(len(pcs)):
+            instruction = self.code[pcs[i]]
+            name = instruction.instruction
+            if(instruction.type == "indirect" or name in ["HALF", "HALT", "END"]):
+                return None
+            if(name == "READ"):
+                state[0] = {-instruction.arg : 1}
+            elif(name == "LOAD"):
+                state[0] = self.operand(state, instruction)
+            elif(name in ["ADD", "SUB"]):
+                state[0] = self.combine(state.get(0, {0 : 1}), self.operand(state, instruction), 1 if name == "ADD" else -1)
+            elif(name == "STORE"):
+                state[instruction.arg] = state.get(0, {0 : 1})
+            if(i + 1 == prefix):
+                loop.test = state.get(0, {0 : 1})
+                loop.effects = dict(state)
+        for (register, form) in state.items():
+            if(register in form):
+                if(form[register] != 1):
+                    return None
+                loop.inductions[register] = self.combine(form, {register : 1}, -1)
+            else:
+                loop.derived[register] = form
+        forms = list(loop.inductions.values()) + list(loop.derived.values()) + list(loop.effects.values()) + [loop.test]
+        if(any(symbol in state for increment in loop.inductions.values() for symbol in increment)):
+            return None
+        if(any(symbol in loop.derived for form in list(loop.derived.values()) + [loop.test] for symbol in form)):
+            return None
+        loop.registers = set(state) | set(symbol for form in forms for symbol in form if symbol != None and symbol >= 0)
+        return loop
+
+    def summarize(self):
+        loops = [None] * len(self.code)
+        for start in self.graph.reachable:
+            loops[start] = self.loop(start)
+        return loops
+
+
+# A register store maps register addresses to integers. Registers which have
+# never been written read as 0 but are not reported by 'in' or items(). A plain
+# dict is the default store; any other store has to provide get(address,
+# default), [], 'in', items(), len() and stats().
+
+def registerStats(registers):
+    if(isinstance(registers, dict)):
+        memory = sys.getsizeof(registers) + sum(sys.getsizeof(address) + sys.getsizeof(value) for (address, value) in registers.items())
+        return {"registers" : len(registers), "memory" : memory}
+    return registers.stats()
+
+
+class PagedRegisters():
+    minimum = -(1 << 63)
+    maximum = (1 << 63) - 1
+
+    def __init__(self, dense = 1 << 16, pagesize = 1 << 8):
+        self.limit = dense
+        self.pagesize = pagesize
+        self.dense = array('q')
+        self.denseUsed = bytearray()
+        self.pages = {}
+        self.large = {}
+        self.count = 0
+
+    def locate(self, address, create = False):
+        if(0 <= address < self.limit):
+            if(address >= len(self.dense)):
+                if(not create):
+                    return None
+                size = min(self.limit, max(address + 1, 2 * len(self.dense))) - len(self.dense)
+                self.dense.frombytes(bytes(8 * size))
+                self.denseUsed.extend(bytes(size))
+            return (self.dense, self.denseUsed, address)
+        page = self.pages.get(address // self.pagesize)
+        if(page == None):
+            if(not create):
+                return None
+            page = (array('q', bytes(8 * self.pagesize)), bytearray(self.pagesize))
+            self.pages[address // self.pagesize] = page
+        return (page[0], page[1], address % self.pagesize)
+
+    def get(self, address, default = 0):
+        cell = self.locate(address)
+        if(cell == None or not cell[1][cell[2]]):
+            return default
+        value = cell[0][cell[2]]
+        return self.large[address] if value == self.minimum else value
+
+    def __getitem__(self, address):
+        return self.get(address)
+
+    def __setitem__(self, address, value):
+        (cells, used, index) = self.locate(address, True)
+        if(not used[index]):
+            used[index] = 1
+            self.count += 1
+        if(self.minimum < value <= self.maximum):
+            if(cells[index] == self.minimum):
+                del self.large[address]
+            cells[index] = value
+        else:
+            cells[index] = self.minimum
+            self.large[address] = value
+
+    def __contains__(self, address):
+        cell = self.locate(address)
+        return cell != None and cell[1][cell[2]] == 1
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        for address in range(len(self.dense)):
+            if(self.denseUsed[address]):
+                yield (address, self.get(address))
+        for key in sorted(self.pages):
+            used = self.pages[key][1]
+            for index in range(self.pagesize):
+                if(used[index]):
+                    yield (key * self.pagesize + index, self.get(key * self.pagesize + index))
+
+    def __str__(self):
+        return str(dict(self.items()))
+
+    def memory(self):
+        size = sys.getsizeof(self.dense) + sys.getsizeof(self.denseUsed) + sys.getsizeof(self.pages) + sys.getsizeof(self.large)
+        size += sum(sys.getsizeof(cells) + sys.getsizeof(used) for (cells, used) in self.pages.values())
+        return size + sum(sys.getsizeof(value) for value in self.large.values())
+
+    def stats(self):
+        return {"registers" : self.count, "memory" : self.memory(), "pages" : len(self.pages), "large" : len(self.large)}
+
+
+class RAM():
+    def __init__(self, program, inp, registers = None, limits = None, optimized = False, summarized = False):
+        program.graph.checkInputs(inp)
+        self.program = program
+        self.inp = inp if isinstance(inp, Inputs) else [int(i) for i in inp]
+        self.prog = program.optimized() if optimized else program.code
+        self.end = len(self.prog) - 1
+        self.reg = registers if registers != None else {}
+        self.reg[0] = 0
         self.PC = 1
+        self.steps = 0
+        self.saved = 0
+        self.limits = limits if limits != None else Limits()
+        self.loops = program.summarized() if summarized else None
+        self.inputs = self.inp if summarized or self.limits.cycles else None
+        self.headers = None
+        if(self.limits.cycles):
+            self.headers = [False] * len(program.code)
+            for header in program.graph.loops():
+                self.headers[header] = True
+        self.mark = None
+        self.state = None
+        self.marked = 0
+
+    def summarize(self, loop):
+        limit = self.limits.steps
+        skip = loop.skip(self.reg, self.inputs, None if limit == None else limit - self.steps)
+        if(skip == None):
+            return False
+        (self.PC, steps) = skip
+        self.steps += steps
+        return True
+
+    # The machine is deterministic, so a state (PC and registers) which repeats
+    # at a loop header repeats forever. The state is remembered at a loop
+    # header whenever the number of steps has doubled since the last time
+    # (Brent's cycle detection), so any cycle is found within a few periods.
+    # Only states with at most 1024 registers are compared. At the same moments
+    # a loop summary (see Loop) proves that a counting loop never exits.
+
+    def detect(self):
+        if(self.PC == self.mark and self.steps > self.marked and len(self.reg) == len(self.state) and dict(self.reg.items()) == self.state):
+            raise LimitError(self.prog[self.PC].linenum, "The program will never stop. The same state repeats every " + str(self.steps - self.marked) + " steps.", "infinite-loop")
+        if(self.steps >= 2 * self.marked):
+            loop = self.program.summarized()[self.PC]
+            if(loop != None and loop.iterations(self.reg, self.inputs)[2] == None):
+                raise LimitError(self.prog[self.PC].linenum, "The program will never stop. The loop starting at this line never exits.", "infinite-loop")
+            self.mark = self.PC if len(self.reg) <= 1024 else None
+            self.state = dict(self.reg.items()) if self.mark != None else None
+            self.marked = max(self.steps, 1)
+        return (self.mark, None if self.state == None else self.state[0], 2 * self.marked)
+
+    def execute(self, checkpoint = None):
+        limits = self.limits
+        if(checkpoint != None and checkpoint.resume):
+            checkpoint.restore(self)
+        if(limits.seconds == None and limits.registers == None and checkpoint == None):
+            return self.run()
+        prog = self.prog
+        started = time.monotonic()
+        granularity = 1.0 if limits.seconds == None else min(0.1, limits.seconds / 10)
+        if(checkpoint != None and checkpoint.seconds != None):
+            granularity = min(granularity, checkpoint.seconds / 4)
+        chunk = 10000
+        try:
+            while(True):
+                target = self.steps + chunk
+                if(checkpoint != None and checkpoint.steps != None):
+                    target = min(target, checkpoint.boundary(self.steps))
+                if(limits.registers != None):
+                    target = min(target, self.steps + max(limits.registers - len(self.reg) + 1, 4096))
+                final = limits.steps != None and target >= limits.steps
+                self.limits = copy.copy(limits)
+                self.limits.steps = limits.steps if final else target
+                begin = (time.monotonic(), self.steps)
+                try:
+                    output = self.run()
+                except LimitError as e:
+                    if(final or e.status != "step-limit"):
+                        raise
+                self.prog = prog
+                if(limits.registers != None and len(self.reg) > limits.registers):
+                    raise LimitError(None if self.PC == 0 else self.program.code[self.PC].linenum, "The program has used more than " + str(limits.registers) + " data registers.", "register-limit")
+                if(self.PC == 0):
+                    return output
+                now = time.monotonic()
+                if(limits.seconds != None and now - started >= limits.seconds):
+                    raise LimitError(self.program.code[self.PC].linenum, "The program has not stopped after " + str(limits.seconds) + " seconds.", "time-limit")
+                chunk = max(1000, int((self.steps - begin[1]) / max(now - begin[0], 0.001) * granularity))
+                if(checkpoint != None and checkpoint.due(self, now)):
+                    checkpoint.save(self)
+        finally:
+            self.limits = limits
+            if(checkpoint != None):
+                checkpoint.wait()
 
     def run(self):
+        limit = self.limits.steps
+        prog = self.prog
+        loops = self.loops
+        headers = self.headers
+        (mark, value, next) = (self.mark, None if self.state == None else self.state[0], 2 * self.marked)
         while(self.PC):
-            if(self.PC == len(self.prog)):
-                self.PC = 0
-                break
-            getattr(self, self.prog[self.PC].instruction)()
+            if(loops != None and loops[self.PC] != None and self.summarize(loops[self.PC])):
+                continue
+            if(headers != None and headers[self.PC] and (self.steps >= next or (self.PC == mark and self.reg[0] == value))):
+                (mark, value, next) = self.detect()
+            if(limit != None and self.steps + prog[self.PC].steps > limit):
+                if(prog is not self.program.code):
+                    prog = self.prog = self.program.code
+                    continue
+                raise LimitError(prog[self.PC].linenum, "The program has not stopped after " + str(limit) + " steps.", "step-limit")
+            getattr(self, prog[self.PC].instruction)()
+            self.steps += 1
+        return self.reg[0]
+
+    def profile(self, profile):
+        prog = self.program.code
+        reg = self.reg
+        inp = self.inp
+        (counts, taken, costs, kinds, static) = (profile.counts, profile.taken, profile.costs, profile.kinds, profile.static)
+        handlers = [None] + [getattr(self, instruction.instruction) for instruction in prog[1:]]
+        limit = self.limits.steps
+        try:
+            while(self.PC):
+                pc = self.PC
+                instruction = prog[pc]
+                if(limit != None and self.steps + instruction.steps > limit):
+                    raise LimitError(instruction.linenum, "The program has not stopped after " + str(limit) + " steps.", "step-limit")
+                kind = kinds[pc]
+                cost = static[pc]
+                if(kind == 1):
+                    cost += reg[0].bit_length() or 1
+                elif(kind == 2):
+                    cost += reg.get(instruction.arg, 0).bit_length() or 1
+                elif(kind == 3):
+                    cost += (reg[0].bit_length() or 1) + (reg.get(instruction.arg, 0).bit_length() or 1)
+                    if(instruction.type == "indirect"):
+                        profile.touch(reg.get(instruction.arg, 0))
+                elif(kind >= profile.JPOS):
+                    value = reg[0]
+                    cost += value.bit_length() or 1
+                    taken[pc] += value > 0 if kind == profile.JPOS else (value == 0 if kind == profile.JZERO else value < 0)
+                elif(kind == 4 or kind == 5):
+                    address = reg.get(instruction.arg, 0)
+                    profile.touch(address)
+                    cost += (address.bit_length() or 1) + (reg.get(address, 0).bit_length() or 1) + (kind == 5 and (reg[0].bit_length() or 1))
+                elif(kind == 6):
+                    cost += inp[instruction.arg - 1].bit_length() or 1
+                elif(kind == 7):
+                    address = reg.get(instruction.arg, 0)
+                    cost += (address.bit_length() or 1) + (inp[address - 1].bit_length() or 1 if 0 < address <= len(inp) else 0)
+                handlers[pc]()
+                self.steps += 1
+                counts[pc] += 1
+                costs[pc] += cost
+        finally:
+            profile.steps = self.steps
+        return self.reg[0]
+
+    def record(self, trace):
+        prog = self.program.code
+        reg = self.reg
+        handlers = [None] + [getattr(self, instruction.instruction) for instruction in prog[1:]]
+        # 1 : writes r0, 2 : writes the register of the argument, 3 : writes the register it points to
+        targets = [0] + [1 if instruction.instruction in ["READ", "LOAD", "ADD", "SUB", "HALF"] else (2 if instruction.type == "direct" else 3) if instruction.instruction == "STORE" else 0 for instruction in prog[1:]]
+        limit = self.limits.steps
+        trace.start(self)
+        try:
+            while(self.PC):
+                pc = self.PC
+                instruction = prog[pc]
+                if(limit != None and self.steps + instruction.steps > limit):
+                    raise LimitError(instruction.linenum, "The program has not stopped after " + str(limit) + " steps.", "step-limit")
+                target = targets[pc]
+                if(target == 3):
+                    address = reg.get(instruction.arg, 0)
+                handlers[pc]()
+                if(target):
+                    address = 0 if target == 1 else instruction.arg if target == 2 else address
+                    trace.write(self.steps, pc, address, reg[address])
+                self.steps += 1
+                if(trace.records >= trace.limit or self.steps >= trace.next):
+                    trace.keyframe(self)
+        except RAMError as e:
+            trace.finish(self, e.status if isinstance(e, LimitError) else "error", str(e))
+            raise
+        except BaseException as e:
+            # an interrupted or failed run still gets its index
+            trace.finish(self, "error", "Error : " + type(e).__name__ + " : " + str(e))
+            raise
+        trace.finish(self, "ok")
         return self.reg[0]
 
     def debug(self):
         step = 1
         print("Initial state:")
-        print("Input registers : " + str(sys.argv[1:]))
+        print("Input registers : " + str(self.inp))
         print("Data registers : " + str(self.reg))
         print("Program counter : " + str(self.PC))
         print("-----------------------")
         while(self.PC):
-            if(self.PC == len(self.prog)):
+            if(self.PC == self.end):
                 self.PC = 0
                 print("Output : " + str(self.reg[0]))
                 return
@@ -289,18 +988,8 @@ class RAM():
             step += 1
             instruction = self.prog[self.PC]
             getattr(self, self.prog[self.PC].instruction)()
-            if(instruction.type == "direct"):
-                code = instruction.instruction + " " + str(instruction.arg)
-            elif(instruction.type == "indirect"):
-                code = instruction.instruction + " (" + str(instruction.arg) + ")"
-            elif(instruction.type == "constant"):
-                code = instruction.instruction + " =" + str(instruction.arg)
-            elif(instruction.arg != None):
-                code = instruction.instruction + " " + str(instruction.arg)            
-            else:
-                code = instruction.instruction
-            print("Executing an instruction : " + code)
-            print("Input registers : " + str(sys.argv[1:]))
+            print("Executing an instruction : " + str(instruction))
+            print("Input registers : " + str(self.inp))
             print("Data registers : " + str(self.reg))
             if(self.PC):
                 print("New program counter value : " + str(self.PC))
@@ -315,123 +1004,68 @@ class RAM():
     def READ(self):
         instruction = self.prog[self.PC]
         if(instruction.type == "direct"):
-            if(len(self.inp) < instruction.arg):
-                print("Error on line " + str(instruction.linenum) + " : Runtime error. It is not possible to read from the input register " + str(instruction.arg) + ". There is no such an input register. Instruction : READ")
-                exit(1)
-            self.reg[0] = int(self.inp[instruction.arg - 1])
+            self.reg[0] = self.inp[instruction.arg - 1]
         elif(instruction.type == "indirect"):
-            if(instruction.arg not in self.reg.keys()):
-                print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid indirect addressing. Since the data register " + str(instruction.arg) + " has not been used yet, it's value is equal to 0. However, there is no such an input register 0. Instruction : READ")
-                exit(1)
+            if(instruction.arg not in self.reg):
+                raise ExecutionError(instruction.linenum, "Invalid indirect addressing. Since the data register " + str(instruction.arg) + " has not been used yet, it's value is equal to 0. However, there is no such an input register 0. Instruction : READ")
             if(self.reg[instruction.arg] not in range(1,(len(self.inp) + 1))):
-                print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid indirect addressing. The data register " + str(instruction.arg) + " contains a value " + str(self.reg[instruction.arg]) + ". However, there is no such an input register. Instruction : READ")
-                exit(1)
-            self.reg[0] = int(self.inp[self.reg[instruction.arg]])
+                raise ExecutionError(instruction.linenum, "Invalid indirect addressing. The data register " + str(instruction.arg) + " contains a value " + str(self.reg[instruction.arg]) + ". However, there is no such an input register. Instruction : READ")
+            self.reg[0] = self.inp[self.reg[instruction.arg] - 1]
         self.PC += 1
 
     def STORE(self):
         instruction = self.prog[self.PC]
         if(instruction.type == "direct"):
-            self.reg[instruction.arg] = int(self.reg[0])
+            self.reg[instruction.arg] = self.reg[0]
         elif(instruction.type == "indirect"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] = int(self.reg[0])
-            else:
-                self.reg[self.reg[instruction.arg]] = int(self.reg[0])
+            self.reg[self.reg.get(instruction.arg, 0)] = self.reg[0]
         self.PC += 1
 
-    def LOAD(self):
-        instruction = self.prog[self.PC]
+    def operand(self, instruction):
         if(instruction.type == "direct"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] = 0
-            else:
-                self.reg[0] = int(self.reg[instruction.arg])
+            return self.reg.get(instruction.arg, 0)
         elif(instruction.type == "indirect"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] = int(self.reg[0])
-            elif(self.reg[instruction.arg] not in self.reg.keys()):
-                self.reg[0] = 0
-            else:
-                self.reg[0] = int(self.reg[self.reg[instruction.reg]])
-        elif(instruction.type == "constant"):
-            self.reg[0] = int(instruction.arg)
+            return self.reg.get(self.reg.get(instruction.arg, 0), 0)
+        return instruction.arg
+
+    def LOAD(self):
+        self.reg[0] = self.operand(self.prog[self.PC])
         self.PC += 1
 
     def ADD(self):
-        instruction = self.prog[self.PC]
-        if(instruction.type == "direct"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] += 0
-            else:
-                self.reg[0] += int(self.reg[instruction.arg])
-        elif(instruction.type == "indirect"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] += int(self.reg[0])
-            elif(self.reg[instruction.arg] not in self.reg.keys()):
-                self.reg[0] += 0
-            else:
-                self.reg[0] += int(self.reg[self.reg[instruction.reg]])
-        elif(instruction.type == "constant"):
-            self.reg[0] += int(instruction.arg)
-        self.PC += 1                    
+        self.reg[0] += self.operand(self.prog[self.PC])
+        self.PC += 1
 
     def SUB(self):
-        instruction = self.prog[self.PC]
-        if(instruction.type == "direct"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] -= 0
-            else:
-                self.reg[0] -= int(self.reg[instruction.arg])
-        elif(instruction.type == "indirect"):
-            if(instruction.arg not in self.reg.keys()):
-                self.reg[0] -= int(self.reg[0])
-            elif(self.reg[instruction.arg] not in self.reg.keys()):
-                self.reg[0] -= 0
-            else:
-                self.reg[0] -= int(self.reg[self.reg[instruction.reg]])
-        elif(instruction.type == "constant"):
-            self.reg[0] -= int(instruction.arg)
-        self.PC += 1 
+        self.reg[0] -= self.operand(self.prog[self.PC])
+        self.PC += 1
 
     def HALF(self):
-        self.reg[0] = int(self.reg[0] / 2)
+        self.reg[0] >>= 1
         self.PC += 1
 
     def JUMP(self):
         instruction = self.prog[self.PC]
-        if(int(instruction.arg) > len(self.prog) - 1):
-            print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid jump. There is no line " + str(instruction.arg) + " in the code. Instruction : JUMP")
-            exit(1)
-        self.PC = int(instruction.arg)
+        self.PC = instruction.arg
 
     def JPOS(self):
         instruction = self.prog[self.PC]
-        if(int(instruction.arg) > len(self.prog) - 1):
-            print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid jump. There is no line " + str(instruction.arg) + " in the code. Instruction : JPOS")
-            exit(1)
         if(self.reg[0] > 0):
-            self.PC = int(instruction.arg)
+            self.PC = instruction.arg
         else:
             self.PC += 1
 
     def JZERO(self):
         instruction = self.prog[self.PC]
-        if(int(instruction.arg) > len(self.prog) - 1):
-            print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid jump. There is no line " + str(instruction.arg) + " in the code. Instruction : JZERO")
-            exit(1)
         if(self.reg[0] == 0):
-            self.PC = int(instruction.arg)
+            self.PC = instruction.arg
         else:
             self.PC += 1
 
     def JNEG(self):
         instruction = self.prog[self.PC]
-        if(int(instruction.arg) > len(self.prog) - 1):
-            print("Error on line " + str(instruction.linenum) + " : Runtime error. Invalid jump. There is no line " + str(instruction.arg) + " in the code. Instruction : JNEG")
-            exit(1)
         if(self.reg[0] < 0):
-            self.PC = int(instruction.arg)
+            self.PC = instruction.arg
         else:
             self.PC += 1
 
@@ -441,13 +1075,1968 @@ class RAM():
     def PASS(self):
         self.PC += 1
 
-if('-h' in sys.argv[1:] or '--help' in sys.argv[1:]):
+    def END(self):
+        self.PC = 0
+        self.steps -= 1
+
+    def FUSED(self):
+        fused = self.prog[self.PC]
+        if(fused.load != None):
+            self.reg[0] = self.operand(fused.load)
+        if(fused.op != None):
+            if(fused.op.instruction == "ADD"):
+                self.reg[0] += self.operand(fused.op)
+            else:
+                self.reg[0] -= self.operand(fused.op)
+        if(fused.store != None):
+            if(fused.store.type == "direct"):
+                self.reg[fused.store.arg] = self.reg[0]
+            else:
+                self.reg[self.reg.get(fused.store.arg, 0)] = self.reg[0]
+        self.PC = fused.next
+        if(fused.jump != None):
+            name = fused.jump.instruction
+            value = self.reg[0]
+            if(name == "JUMP" or (name == "JPOS" and value > 0) or (name == "JZERO" and value == 0) or (name == "JNEG" and value < 0)):
+                self.PC = fused.jump.arg
+        self.steps += fused.saved
+        self.saved += fused.saved
+
+
+# With a width, the compiler keeps the data registers 0 to width - 1 in
+# variables of the compiled program instead of a dictionary (see FastRAM), as
+# long as their values fit into 64 bits. A store of a larger value calls
+# overflow with the line, the number of instructions of the block executed
+# before it and the accumulator, so that the run can continue from there with
+# unlimited integers. The bounds are checked only when the accumulator may have
+# left them since the last check (after READ, ADD and SUB). Registers which were
+# set to 0 are marked in used, because the variables cannot tell them from the
+# registers which have not been used.
+
+class Compiler():
+    # the bounds of a signed 64-bit integer
+    LOW = -1 << 63
+    HIGH = (1 << 63) - 1
+
+    def __init__(self, program, width = None):
+        self.prog = program.instructions
+        self.graph = program.graph
+        self.width = width
+        self.bounded = True
+        self.source = None
+        self.code = None
+        self.sizes = None
+
+    def next(self, pc):
+        return pc + 1 if pc + 1 < len(self.prog) else 0
+
+    def operand(self, instruction):
+        if(instruction.type == "constant"):
+            return str(instruction.arg)
+        if(instruction.type == "direct"):
+            if(instruction.arg == 0):
+                return "a"
+            return "r" + str(instruction.arg) if self.width != None else "reg.get(" + str(instruction.arg) + ", 0)"
+        pointer = "a" if instruction.arg == 0 else "reg.get(" + str(instruction.arg) + ", 0)"
+        return "(reg.get(p, 0) if p else a)", pointer
+
+    def store(self, address, pc, executed, out):
+        if(self.width == None):
+            out.append("reg[" + address + "] = a")
+            return
+        if(not self.bounded):
+            out.append("if a < " + str(self.LOW) + " or a > " + str(self.HIGH) + ": overflow(" + str(pc) + ", " + str(executed) + ", a)")
+            self.bounded = True
+        out.append("r" + address + " = a")
+        if(address != "0"):
+            out.append("if not a: used[" + address + "] = 1")
+
+    def compileInstruction(self, pc, out, executed = 0):
+        instruction = self.prog[pc]
+        name = instruction.instruction
+        line = str(instruction.linenum)
+        if(name in ["LOAD", "ADD", "SUB"]):
+            operand = self.operand(instruction)
+            if(instruction.type == "indirect"):
+                out.append("p = " + operand[1])
+                operand = operand[0]
+            op = {"LOAD" : " = ", "ADD" : " += ", "SUB" : " -= "}[name]
+            if(name != "LOAD" or operand != "a"):
+                out.append("a" + op + operand)
+            if(name == "LOAD"):
+                self.bounded = instruction.type == "direct" or self.LOW <= instruction.arg <= self.HIGH
+            else:
+                self.bounded = False
+        elif(name == "STORE"):
+            if(instruction.type == "direct"):
+                if(instruction.arg != 0):
+                    self.store(str(instruction.arg), pc, executed, out)
+            else:
+                out.append("p = " + self.operand(instruction)[1])
+                out.append("if p: reg[p] = a")
+        elif(name == "READ"):
+            arg = str(instruction.arg)
+            self.bounded = False
+            if(instruction.type == "direct"):
+                out.append("a = inp[" + str(instruction.arg - 1) + "]")
+            else:
+                if(instruction.arg != 0):
+                    out.append("if " + arg + " not in reg: error(" + line + ", " + repr("Invalid indirect addressing. Since the data register " + arg + " has not been used yet, it's value is equal to 0. However, there is no such an input register 0. Instruction : READ") + ")")
+                out.append("p = " + self.operand(instruction)[1])
+                out.append("if p < 1 or p > ninp: error(" + line + ", " + repr("Invalid indirect addressing. The data register " + arg + " contains a value ") + " + str(p) + " + repr(". However, there is no such an input register. Instruction : READ") + ")")
+                out.append("a = inp[p - 1]")
+        elif(name == "HALF"):
+            out.append("a >>= 1")
+        elif(name in ["JUMP", "JPOS", "JZERO", "JNEG"]):
+            self.store("0", pc, executed, out)
+            condition = {"JUMP" : None, "JPOS" : "a > 0", "JZERO" : "a == 0", "JNEG" : "a < 0"}[name]
+            if(condition == None):
+                out.append("return " + str(instruction.arg))
+            else:
+                out.append("return " + str(instruction.arg) + " if " + condition + " else " + str(self.next(pc)))
+            return True
+        elif(name == "HALT"):
+            self.store("0", pc, executed, out)
+            out.append("return 0")
+            return True
+        return False
+
+    def compile(self):
+        fast = self.width != None
+        source = ["def instantiate(reg, inp, error" + (", used, overflow" if fast else "") + "):", "    ninp = len(inp)"]
+        registers = ["r" + str(address) for address in range(self.width or 0)]
+        if(fast):
+            source += ["    " + register + " = reg.get(" + register[1:] + ", 0)" for register in registers]
+        self.sizes = [0] * (len(self.prog) + 1)
+        starts = sorted(self.graph.reachable)
+        for start in starts:
+            block = self.graph.blocks[start]
+            body = ["a = " + ("r0" if fast else "reg[0]")]
+            self.bounded = True
+            for pc in range(block.start, block.end + 1):
+                if(self.compileInstruction(pc, body, pc - block.start)):
+                    break
+            else:
+                self.store("0", self.next(block.end), len(block), body)
+                body.append("return " + str(self.next(block.end)))
+            self.sizes[start] = len(block)
+            source.append("    def block" + str(start) + "():")
+            written = [register for register in registers if register + " = a" in body]
+            if(written):
+                source.append("        nonlocal " + ", ".join(written))
+            source += ["        " + statement for statement in body]
+        source.append("    def block" + str(len(self.prog)) + "():")
+        source.append("        return 0")
+        source.append("    blocks = [None] * " + str(len(self.prog) + 1))
+        for start in starts + [len(self.prog)]:
+            source.append("    blocks[" + str(start) + "] = block" + str(start))
+        if(fast):
+            source.append("    def registers():")
+            source.append("        return [" + ", ".join(registers) + "]")
+            source.append("    return (blocks, registers)")
+        else:
+            source.append("    return blocks")
+        self.source = "\n".join(source) + "\n"
+        self.code = compile(self.source, "<RAM program>", "exec")
+        return self
+
+    def instantiate(self, reg, inp, error, *fast):
+        if(self.code == None):
+            self.compile()
+        namespace = {}
+        exec(self.code, namespace)
+        return namespace["instantiate"](reg, inp, error, *fast)
+
+
+class CompiledRAM(RAM):
+    def __init__(self, program, inp, registers = None, limits = None, summarized = False):
+        RAM.__init__(self, program, inp, registers, limits, False, summarized)
+        self.compiler = program.compiled()
+
+    def error(self, linenum, message):
+        raise ExecutionError(linenum, message)
+
+    def run(self):
+        blocks = self.compiler.instantiate(self.reg, self.inp.values if isinstance(self.inp, Inputs) else self.inp, self.error)
+        sizes = self.compiler.sizes
+        limit = self.limits.steps
+        while(self.PC and blocks[self.PC] == None):
+            if(limit != None and self.steps + 1 > limit):
+                return RAM.run(self)
+            getattr(self, self.prog[self.PC].instruction)()
+            self.steps += 1
+        pc = self.PC
+        steps = self.steps
+        if(self.loops != None or self.headers != None):
+            (loops, headers) = (self.loops, self.headers)
+            reg = self.reg
+            (mark, value, next) = (self.mark, None if self.state == None else self.state[0], 2 * self.marked)
+            if(loops == None):
+                # loop headers are marked by negative block sizes
+                marked = [-sizes[pc] if headers[pc] else sizes[pc] for pc in range(len(sizes))]
+                safe = limit - max(sizes) if limit != None else steps + (1 << 62)
+                while(pc and steps <= safe):
+                    size = marked[pc]
+                    if(size < 0):
+                        size = -size
+                        if(steps >= next or (pc == mark and reg[0] == value)):
+                            (self.PC, self.steps) = (pc, steps)
+                            (mark, value, next) = self.detect()
+                    steps += size
+                    pc = blocks[pc]()
+            while(pc):
+                if(loops != None and loops[pc] != None):
+                    (self.PC, self.steps) = (pc, steps)
+                    if(self.summarize(loops[pc])):
+                        (pc, steps) = (self.PC, self.steps)
+                        continue
+                if(headers != None and headers[pc] and (steps >= next or (pc == mark and reg[0] == value))):
+                    (self.PC, self.steps) = (pc, steps)
+                    (mark, value, next) = self.detect()
+                if(limit != None and steps + sizes[pc] > limit):
+                    break
+                steps += sizes[pc]
+                pc = blocks[pc]()
+        elif(limit == None):
+            while(pc):
+                steps += sizes[pc]
+                pc = blocks[pc]()
+        else:
+            safe = limit - max(sizes)
+            while(pc and steps <= safe):
+                steps += sizes[pc]
+                pc = blocks[pc]()
+            while(pc and steps + sizes[pc] <= limit):
+                steps += sizes[pc]
+                pc = blocks[pc]()
+        self.PC = pc
+        self.steps = steps
+        if(self.PC):
+            return RAM.run(self)
+        return self.reg[0]
+
+
+# The fast engine runs the compiled program with the data registers in
+# variables of the compiled blocks, which are read and written without a
+# dictionary, as long as every stored value fits into 64 bits. When a larger
+# value is stored, the registers are moved back to the dictionary and the run
+# continues in CompiledRAM from the instruction which overflowed, with
+# unlimited integers. Programs with indirect addressing, loop summaries, cycle
+# detection and paged registers always use CompiledRAM. (CPython has no unboxed
+# integers outside of arrays, and an array of 64-bit integers is slower than a
+# dictionary, because every read creates a new integer object.)
+
+class Overflow(Exception):
+    def __init__(self, pc, executed, value):
+        Exception.__init__(self, pc, executed, value)
+        self.pc = pc
+        self.executed = executed
+        self.value = value
+
+class FastRAM(CompiledRAM):
+    def overflow(self, pc, executed, value):
+        raise Overflow(pc, executed, value)
+
+    def run(self):
+        compiler = self.program.compiled(True)
+        if(compiler == None or self.loops != None or self.headers != None or type(self.reg) != dict):
+            return CompiledRAM.run(self)
+        limit = self.limits.steps
+        while(self.PC and self.compiler.sizes[self.PC] == 0):
+            if(limit != None and self.steps + 1 > limit):
+                return RAM.run(self)
+            getattr(self, self.prog[self.PC].instruction)()
+            self.steps += 1
+        if(any(address < 0 or address >= compiler.width or value < compiler.LOW or value > compiler.HIGH for (address, value) in self.reg.items())):
+            return CompiledRAM.run(self)
+        used = bytearray(compiler.width)
+        for address in self.reg:
+            used[address] = 1
+        (blocks, registers) = compiler.instantiate(self.reg, self.inp.values if isinstance(self.inp, Inputs) else self.inp, self.error, used, self.overflow)
+        sizes = compiler.sizes
+        pc = self.PC
+        steps = self.steps
+        value = None
+        try:
+            if(limit == None):
+                while(pc):
+                    steps += sizes[pc]
+                    pc = blocks[pc]()
+            else:
+                safe = limit - max(sizes)
+                while(pc and steps <= safe):
+                    steps += sizes[pc]
+                    pc = blocks[pc]()
+                while(pc and steps + sizes[pc] <= limit):
+                    steps += sizes[pc]
+                    pc = blocks[pc]()
+        except Overflow as e:
+            # the block stopped before the instruction which overflowed
+            steps += e.executed - sizes[pc]
+            (pc, value) = (e.pc, e.value)
+        # the registers are given back in the dictionary the machine was created with
+        values = registers()
+        self.reg.clear()
+        self.reg.update((address, values[address]) for address in range(len(values)) if values[address] or used[address])
+        self.reg[0] = values[0] if value == None else value
+        self.PC = pc
+        self.steps = steps
+        if(value != None):
+            return CompiledRAM.run(self)
+        if(self.PC):
+            return RAM.run(self)
+        return self.reg[0]
+
+
+class Debugger():
+    condition = re.compile(r'r(\d+) *(<=|>=|==|!=|<|>|=) *(r?)(-?\d+)$')
+    comparisons = {"<" : lambda a, b : a < b, "<=" : lambda a, b : a <= b, ">" : lambda a, b : a > b, ">=" : lambda a, b : a >= b, "=" : lambda a, b : a == b, "==" : lambda a, b : a == b, "!=" : lambda a, b : a != b}
+    help = [
+        "break N [if rX OP Y] : stops before the line N is executed (only if the condition holds)",
+        "delete N : removes the breakpoint at the line N",
+        "watch X : stops whenever the value of rX changes",
+        "unwatch X : removes the watchpoint on rX",
+        "step [N] : executes N instructions (1 by default)",
+        "continue : runs until a breakpoint or a watchpoint stops the program",
+        "finish : runs until the program leaves the innermost loop (or ends)",
+        "print [X ...] : prints the given registers (all registers by default)",
+        "info : prints the breakpoints and the watchpoints",
+        "quit : stops the debugger",
+        "OP is one of <, <=, >, >=, ==, != and Y is a number or a register rY. An empty line repeats the last command.",
+    ]
+
+    def __init__(self, ram, commands = None, out = None):
+        self.ram = ram
+        self.prog = ram.prog
+        self.commands = commands if commands != None else sys.stdin
+        self.out = out if out != None else sys.stdout
+        self.handlers = [None] + [getattr(ram, instruction.instruction) for instruction in self.prog[1:]]
+        self.breakpoints = {}
+        self.watchpoints = set()
+        self.watching = set()
+        self.shown = dict(ram.reg.items())
+        self.aliases = {"b" : "break", "d" : "delete", "w" : "watch", "s" : "step", "c" : "continue", "f" : "finish", "p" : "print", "i" : "info", "q" : "quit", "h" : "help"}
+
+    def write(self, line):
+        self.out.write(line + "\n")
+
+    def holds(self, condition):
+        if(condition == None):
+            return True
+        (register, comparison, indirect, value) = condition
+        reg = self.ram.reg
+        return self.comparisons[comparison](reg.get(register, 0), reg.get(value, 0) if indirect else value)
+
+    def watch(self):
+        self.watching = set()
+        for pc in range(1, len(self.prog)):
+            instruction = self.prog[pc]
+            if(instruction.instruction == "STORE" and (instruction.type == "indirect" or instruction.arg in self.watchpoints)):
+                self.watching.add(pc)
+            elif(0 in self.watchpoints and instruction.instruction in ["READ", "LOAD", "ADD", "SUB", "HALF"]):
+                self.watching.add(pc)
+
+    def step(self):
+        ram = self.ram
+        before = [(register, ram.reg.get(register, 0)) for register in self.watchpoints]
+        self.handlers[ram.PC]()
+        ram.steps += 1
+        if(ram.PC == len(self.prog) - 1):
+            ram.PC = 0
+        for (register, value) in before:
+            if(ram.reg.get(register, 0) != value):
+                return "Watchpoint r" + str(register) + " : " + str(value) + " -> " + str(ram.reg.get(register, 0))
+        return None
+
+    def loop(self):
+        pc = self.ram.PC
+        inner = None
+        for (start, end) in self.ram.program.graph.loops().items():
+            if(start <= pc <= end and (inner == None or end - start < inner[1] - inner[0])):
+                inner = (start, end)
+        return inner
+
+    def advance(self, region = None):
+        ram = self.ram
+        handlers = self.handlers
+        stops = set(self.breakpoints) | self.watching
+        if(region != None):
+            for block in ram.program.graph.blocks.values():
+                if(region[0] <= block.start <= region[1]):
+                    stops.update(successor for successor in block.successors if successor and not region[0] <= successor <= region[1])
+        reason = self.step()
+        while(ram.PC and reason == None):
+            pc = ram.PC
+            if(pc in stops):
+                if(region != None and not region[0] <= pc <= region[1]):
+                    return "Left the loop at lines " + str(region[0]) + "-" + str(region[1])
+                if(pc in self.breakpoints and self.holds(self.breakpoints[pc])):
+                    return "Breakpoint at line " + str(pc)
+                reason = self.step()
+            else:
+                handlers[pc]()
+                ram.steps += 1
+        return reason
+
+    def show(self, reason = None):
+        ram = self.ram
+        if(reason != None):
+            self.write(reason)
+        if(ram.PC):
+            self.write("Step " + str(ram.steps) + ", line " + str(ram.PC) + " : " + str(self.prog[ram.PC]))
+        current = dict(ram.reg.items())
+        changed = [(register, value) for (register, value) in sorted(current.items()) if self.shown.get(register) != value]
+        if(changed):
+            self.write("Changed registers : " + ", ".join("r" + str(register) + " = " + str(value) for (register, value) in changed))
+        self.shown = current
+
+    def line(self, word):
+        if(not word.isnumeric() or not 0 < int(word) < len(self.prog) - 1):
+            raise ValueError("There is no line " + word + " in the code")
+        return int(word)
+
+    def command(self, words):
+        name = self.aliases.get(words[0], words[0])
+        args = words[1:]
+        if(name == "break"):
+            pc = self.line(args[0])
+            condition = None
+            if(len(args) > 1):
+                match = self.condition.match(" ".join(args[2:])) if args[1] == "if" else None
+                if(match == None):
+                    raise ValueError("Invalid condition " + " ".join(args[1:]))
+                condition = (int(match.group(1)), match.group(2), match.group(3) == "r", int(match.group(4)))
+            self.breakpoints[pc] = condition
+            self.write("Breakpoint at line " + str(pc) + ("" if condition == None else " if " + " ".join(args[2:])))
+        elif(name == "delete"):
+            pc = self.line(args[0])
+            if(pc not in self.breakpoints):
+                raise ValueError("There is no breakpoint at the line " + args[0])
+            del self.breakpoints[pc]
+        elif(name in ["watch", "unwatch"]):
+            register = int(args[0].lstrip("r"))
+            if(name == "watch"):
+                self.watchpoints.add(register)
+            else:
+                self.watchpoints.discard(register)
+            self.watch()
+        elif(name == "step"):
+            reason = None
+            for i in range(int(args[0]) if args else 1):
+                reason = self.step()
+                if(reason != None or self.ram.PC == 0):
+                    break
+            self.show(reason)
+        elif(name == "continue"):
+            self.show(self.advance())
+        elif(name == "finish"):
+            self.show(self.advance(self.loop()))
+        elif(name == "print"):
+            registers = [int(arg.lstrip("r")) for arg in args] if args else sorted(register for (register, value) in self.ram.reg.items())
+            self.write(", ".join("r" + str(register) + " = " + str(self.ram.reg.get(register, 0)) for register in registers))
+        elif(name == "info"):
+            for (pc, condition) in sorted(self.breakpoints.items()):
+                self.write("Breakpoint at line " + str(pc) + " : " + str(self.prog[pc]) + ("" if condition == None else " if r" + str(condition[0]) + " " + condition[1] + " " + ("r" if condition[2] else "") + str(condition[3])))
+            for register in sorted(self.watchpoints):
+                self.write("Watchpoint r" + str(register))
+        elif(name == "help"):
+            for line in self.help:
+                self.write(line)
+        elif(name == "quit"):
+            return False
+        else:
+            self.write("Unknown command " + words[0] + ". Type 'help' to see the list of commands.")
+        return True
+
+    def session(self):
+        self.write("Input registers : " + str(self.ram.inp))
+        self.show()
+        last = ["help"]
+        while(self.ram.PC):
+            self.out.write("(ram) ")
+            self.out.flush()
+            line = self.commands.readline()
+            if(not line):
+                break
+            words = line.split() or last
+            last = words
+            try:
+                if(not self.command(words)):
+                    break
+            except IndexError:
+                self.write("Missing argument of the command " + words[0])
+            except ValueError as e:
+                self.write("Invalid command " + " ".join(words) + " : " + str(e))
+        if(self.ram.PC == 0):
+            self.write("Output : " + str(self.ram.reg[0]))
+            self.write("Steps : " + str(self.ram.steps))
+
+
+# Integers in checkpoints and traces are written as zigzag encoded varints.
+
+def encode(value, out):
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while(value > 0x7f):
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode(data, pos):
+    value = 0
+    shift = 0
+    while(True):
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if(byte < 0x80):
+            break
+    return ((value >> 1) if value & 1 == 0 else -((value + 1) >> 1), pos)
+
+
+# A checkpoint file starts with the magic bytes, the SHA-256 digest of the
+# program and its input registers, and the program counter, the number of steps
+# and the number of data registers as unsigned 64 bit integers. Every register
+# follows as two zigzag encoded varints (address and value) and the file ends
+# with the CRC-32 of everything before it. The checkpoints alternate between
+# two files, which are replaced atomically, so at least one of them is valid.
+
+class Checkpointer():
+    magic = b"RAMC\x01"
+    header = struct.Struct("<QQQ")
+
+    def __init__(self, path, steps = None, seconds = None, resume = False):
+        self.path = path
+        self.steps = steps or None
+        self.seconds = seconds if seconds != None or self.steps != None else 60
+        self.resume = resume
+        self.written = 0
+        self.writer = None
+        self.resumed = None
+        self.last = time.monotonic()
+        self.key = None
+
+    def digest(self, ram):
+        # Computed once per run, the inputs may be millions of registers
+        if(self.key == None or self.key[0] is not ram.program or self.key[1] is not ram.inp):
+            digest = hashlib.sha256((ram.program.hash() + "\n").encode())
+            for start in range(0, len(ram.inp), 1 << 16):
+                digest.update(((" " if start else "") + " ".join(str(i) for i in ram.inp[start:start + (1 << 16)])).encode())
+            self.key = (ram.program, ram.inp, digest.digest())
+        return self.key[2]
+
+    def snapshot(self, ram):
+        registers = list(ram.reg.items())
+        out = bytearray(self.magic + self.digest(ram) + self.header.pack(ram.PC, ram.steps, len(registers)))
+        for (address, value) in registers:
+            encode(address, out)
+            encode(value, out)
+        out += struct.pack("<I", zlib.crc32(out))
+        return bytes(out)
+
+    def load(self, path, digest):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        start = len(self.magic) + len(digest)
+        if(len(data) < start + self.header.size + 4 or not data.startswith(self.magic) or data[len(self.magic):start] != digest):
+            return None
+        if(struct.unpack("<I", data[-4:])[0] != zlib.crc32(data[:-4])):
+            return None
+        (pc, steps, count) = self.header.unpack_from(data, start)
+        pos = start + self.header.size
+        registers = []
+        try:
+            for i in range(count):
+                (address, pos) = decode(data, pos)
+                (value, pos) = decode(data, pos)
+                registers.append((address, value))
+        except IndexError:
+            return None
+        return (pc, steps, registers)
+
+    def files(self):
+        return [self.path + ".0", self.path + ".1"]
+
+    def write(self, data, path):
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def save(self, ram):
+        data = self.snapshot(ram)
+        self.wait()
+        self.writer = threading.Thread(target = self.write, args = (data, self.files()[self.written % 2]))
+        self.writer.start()
+        self.written += 1
+        self.last = time.monotonic()
+
+    def wait(self):
+        if(self.writer != None):
+            self.writer.join()
+            self.writer = None
+
+    def restore(self, ram):
+        digest = self.digest(ram)
+        newest = None
+        for (index, path) in enumerate(self.files()):
+            snapshot = self.load(path, digest)
+            if(snapshot != None and (newest == None or snapshot[1] > newest[1][1])):
+                newest = (index, snapshot)
+        if(newest == None):
+            return False
+        (index, (pc, steps, registers)) = newest
+        (ram.PC, ram.steps) = (pc, steps)
+        for (address, value) in registers:
+            ram.reg[address] = value
+        self.written = index + 1
+        self.resumed = steps
+        return True
+
+    def boundary(self, steps):
+        return None if self.steps == None else (steps // self.steps + 1) * self.steps
+
+    def due(self, ram, now):
+        return (self.steps != None and ram.steps % self.steps == 0) or (self.seconds != None and now - self.last >= self.seconds)
+
+# A trace consists of blocks. A block starts with a keyframe (the number of
+# executed steps, the program counter and all data registers) and continues
+# with a record for every executed instruction which wrote a register: the
+# steps since the previous record, the line, the address and the new value.
+# The instructions between two records only jump, so the program counter at any
+# step is found by following the jumps from the last record. A new block starts
+# when it has as many records as its keyframe has registers (at least
+# `interval`), so the keyframes take at most as much space as the records, or
+# after 16 times as many steps without any write. The file ends with the
+# program, the final state and an index: where every block starts, and for
+# every register the blocks which write it with the lowest and highest value
+# written there. The offset of the index is in the last 8 bytes of the file.
+
+class TraceWriter():
+    magic = b"RAMT\x01"
+
+    def __init__(self, path, interval = 4096):
+        self.path = path
+        self.interval = interval
+        self.file = None
+        self.buffer = bytearray()
+        self.offset = 0
+        self.blocks = []
+        self.postings = {}
+        self.written = {}
+        self.records = 0
+        self.limit = 0
+        self.next = 0
+        self.last = 0
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.offset += len(self.buffer)
+        self.buffer = bytearray()
+
+    def start(self, ram):
+        self.file = open(self.path, "wb")
+        self.buffer += self.magic
+        self.keyframe(ram)
+
+    def close(self):
+        for (address, (low, high)) in self.written.items():
+            self.postings.setdefault(address, []).append((len(self.blocks) - 1, low, high))
+        self.written = {}
+
+    def keyframe(self, ram):
+        self.close()
+        if(len(self.buffer) >= 1 << 20):
+            self.flush()
+        self.blocks.append((ram.steps, self.offset + len(self.buffer)))
+        registers = list(ram.reg.items())
+        for value in [ram.steps, ram.PC, len(registers)]:
+            encode(value, self.buffer)
+        for (address, value) in registers:
+            encode(address, self.buffer)
+            encode(value, self.buffer)
+        size = max(self.interval, len(registers))
+        self.limit = self.records + size
+        self.next = ram.steps + 16 * size
+        self.last = ram.steps
+
+    def write(self, steps, pc, address, value):
+        out = self.buffer
+        encode(steps - self.last, out)
+        encode(pc, out)
+        encode(address, out)
+        encode(value, out)
+        self.last = steps
+        self.records += 1
+        bounds = self.written.get(address)
+        if(bounds == None):
+            self.written[address] = (value, value)
+        elif(value < bounds[0] or value > bounds[1]):
+            self.written[address] = (min(value, bounds[0]), max(value, bounds[1]))
+
+    def finish(self, ram, status, message = None):
+        try:
+            self.close()
+            index = self.offset + len(self.buffer)
+            out = self.buffer
+            program = "\n".join(str(instruction) for instruction in ram.program.instructions[1:]).encode()
+            encode(len(program), out)
+            out += program
+            # The output is written in hexadecimal, which has no limit on the number of digits
+            for text in [status, hex(ram.reg[0]) if status == "ok" else message or ""]:
+                encode(len(text.encode()), out)
+                out += text.encode()
+            for value in [ram.steps, ram.PC, self.records, len(self.blocks)]:
+                encode(value, out)
+            for (steps, offset) in self.blocks:
+                encode(steps, out)
+                encode(offset, out)
+            encode(len(self.postings), out)
+            for (address, postings) in self.postings.items():
+                encode(address, out)
+                encode(len(postings), out)
+                for (block, low, high) in postings:
+                    encode(block, out)
+                    encode(low, out)
+                    encode(high, out)
+            out += struct.pack("<Q", index)
+            self.flush()
+        finally:
+            self.file.close()
+
+
+class TraceReader():
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self.data = f.read()
+        data = self.data
+        if(len(data) < 13 or data[:5] != TraceWriter.magic):
+            raise ValueError("Not a trace file : " + path)
+        (pos,) = struct.unpack_from("<Q", data, len(data) - 8)
+        self.end = pos
+        texts = []
+        for _ in range(3):
+            (length, pos) = decode(data, pos)
+            texts.append(data[pos:pos + length].decode())
+            pos += length
+        (source, self.status, self.output) = texts
+        if(self.status == "ok"):
+            self.output = int(self.output, 0)
+        self.program = parse(source + "\n")
+        values = []
+        for _ in range(4):
+            (value, pos) = decode(data, pos)
+            values.append(value)
+        (self.steps, self.PC, self.records, count) = values
+        self.blocks = []
+        for _ in range(count):
+            (steps, pos) = decode(data, pos)
+            (offset, pos) = decode(data, pos)
+            self.blocks.append((steps, offset))
+        self.postings = {}
+        (count, pos) = decode(data, pos)
+        for _ in range(count):
+            (address, pos) = decode(data, pos)
+            (length, pos) = decode(data, pos)
+            postings = []
+            for _ in range(length):
+                entry = []
+                for _ in range(3):
+                    (value, pos) = decode(data, pos)
+                    entry.append(value)
+                postings.append(tuple(entry))
+            self.postings[address] = postings
+
+    def block(self, index):
+        data = self.data
+        pos = self.blocks[index][1]
+        end = self.blocks[index + 1][1] if index + 1 < len(self.blocks) else self.end
+        (steps, pos) = decode(data, pos)
+        (pc, pos) = decode(data, pos)
+        (count, pos) = decode(data, pos)
+        registers = {}
+        for _ in range(count):
+            (address, pos) = decode(data, pos)
+            (registers[address], pos) = decode(data, pos)
+        records = []
+        last = steps
+        while(pos < end):
+            entry = []
+            for _ in range(4):
+                (value, pos) = decode(data, pos)
+                entry.append(value)
+            last += entry[0]
+            records.append((last, entry[1], entry[2], entry[3]))
+        return (steps, pc, registers, records)
+
+    def search(self, count, predicate):
+        # the first index for which the monotone predicate holds
+        (low, high) = (0, count)
+        while(low < high):
+            middle = (low + high) // 2
+            if(predicate(middle)):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def follow(self, pc, value, count):
+        code = self.program.code
+        while(count > 0 and pc):
+            instruction = code[pc]
+            name = instruction.instruction
+            if(name == "END"):
+                return 0
+            if(name == "JUMP" or (name == "JPOS" and value > 0) or (name == "JZERO" and value == 0) or (name == "JNEG" and value < 0)):
+                pc = instruction.arg
+            elif(name == "HALT"):
+                pc = 0
+            elif(name in ["JPOS", "JZERO", "JNEG", "PASS"]):
+                pc += 1
+            else:
+                raise ValueError("The trace does not match its program at line " + str(pc))
+            count -= 1
+        return pc if pc == 0 or code[pc].instruction != "END" else 0
+
+    def state(self, steps):
+        steps = max(self.blocks[0][0], min(steps, self.steps))
+        index = self.search(len(self.blocks), lambda i : self.blocks[i][0] > steps) - 1
+        (last, pc, registers, records) = self.block(index)
+        for (step, line, address, value) in records:
+            if(step >= steps):
+                break
+            registers[address] = value
+            (last, pc) = (step + 1, line + 1)
+        return (steps, self.follow(pc, registers.get(0, 0), steps - last), registers)
+
+    def writes(self, address):
+        for (block, low, high) in self.postings.get(address, []):
+            for (step, pc, written, value) in self.block(block)[3]:
+                if(written == address):
+                    yield (step + 1, pc, value)
+
+    def first(self, address, operator, bound):
+        holds = {"<" : lambda value : value < bound, "<=" : lambda value : value <= bound, ">" : lambda value : value > bound, ">=" : lambda value : value >= bound, "==" : lambda value : value == bound, "!=" : lambda value : value != bound}[operator]
+        (start, pc, registers, records) = self.block(0)
+        if(holds(registers.get(address, 0))):
+            return start
+        postings = self.postings.get(address, [])
+        if(operator in ["<", "<=", ">", ">="]):
+            # the lowest (highest) value written so far only decreases (increases)
+            extremes = []
+            for (block, low, high) in postings:
+                extreme = low if operator[0] == "<" else high
+                extremes.append(extreme if not extremes else (min if operator[0] == "<" else max)(extremes[-1], extreme))
+            candidates = postings[self.search(len(postings), lambda i : holds(extremes[i])):][:1]
+        elif(operator == "=="):
+            candidates = [posting for posting in postings if posting[1] <= bound <= posting[2]]
+        else:
+            candidates = [posting for posting in postings if not posting[1] == posting[2] == bound]
+        for (block, low, high) in candidates:
+            for (step, line, written, value) in self.block(block)[3]:
+                if(written == address and holds(value)):
+                    return step + 1
+        return None
+
+    def query(self, words):
+        text = " ".join(words)
+        match = re.fullmatch(r'\s*(info|state|writes|first)\s*(.*?)\s*', text)
+        if(match == None):
+            raise ValueError("Unknown query : " + text)
+        (command, argument) = match.groups()
+        code = self.program.code
+        if(command == "info"):
+            return ["Steps : " + str(self.steps), "Writes : " + str(self.records), "Blocks : " + str(len(self.blocks)), "Status : " + self.status, ("Output : " + str(self.output) if self.status == "ok" else "Message : " + self.output)]
+        if(command == "state" and argument.isnumeric()):
+            (steps, pc, registers) = self.state(int(argument))
+            return ["Step : " + str(steps), "Next line : " + (str(code[pc].linenum) + " (" + str(code[pc]) + ")" if pc else "stopped"), "Registers : " + str(dict(sorted(registers.items())))]
+        match = re.fullmatch(r'r?(-?\d+)', argument)
+        if(command == "writes" and match != None):
+            return ["Step " + str(step) + " : line " + str(code[pc].linenum) + " (" + str(code[pc]) + ") : r" + match.group(1) + " = " + str(value) for (step, pc, value) in self.writes(int(match.group(1)))]
+        match = re.fullmatch(r'r?(-?\d+)\s*(<=|>=|==|!=|<|>)\s*(-?\d+)', argument)
+        if(command == "first" and match != None):
+            step = self.first(int(match.group(1)), match.group(2), int(match.group(3)))
+            return ["Never" if step == None else "Step : " + str(step)]
+        raise ValueError("Invalid argument of the query " + command + " : " + argument)
+
+
+class Limits():
+    def __init__(self, steps = None, seconds = None, registers = None, cycles = False):
+        self.steps = steps
+        self.seconds = seconds
+        self.registers = registers
+        self.cycles = cycles
+
+
+class Result():
+    def __init__(self, output, status, steps, registers, message = None):
+        self.output = output
+        self.status = status
+        self.steps = steps
+        self.registers = registers
+        self.message = message
+
+
+# Results are remembered under the normalized program (see Program.hash, which
+# ignores comments and whitespace but keeps the line numbers), the input
+# registers and the limits. The most recently used ones are kept in memory and
+# all of them in an optional SQLite database. Runtime and validation errors are
+# remembered as well; runs stopped by the time limit are not, since they would
+# not stop at the same step again. A remembered result has no registers.
+
+class ResultCache():
+    ERRORS = {"ExecutionError" : ExecutionError, "ValidationError" : ValidationError}
+    # Results stored before a change of the semantics of the instructions are not reused
+    VERSION = "2"
+
+    def __init__(self, size = 4096, path = None):
+        self.size = size
+        self.path = path
+        self.entries = collections.OrderedDict()
+        self.database = None
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["database"] = None
+        return state
+
+    def key(self, program, inp, limits):
+        limits = limits if limits != None else Limits()
+        return self.VERSION + ":" + program.hash() + ":" + ",".join(str(i) for i in inp) + ":" + ",".join(str(limit) for limit in [limits.steps, limits.seconds, limits.registers, limits.cycles])
+
+    def connect(self):
+        if(self.database == None):
+            # imported here, so that runs without -U do not load it
+            import sqlite3
+            self.database = sqlite3.connect(self.path, timeout = 60)
+            self.database.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, output TEXT, status TEXT, steps TEXT, linenum INTEGER, message TEXT)")
+        return self.database
+
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if(len(self.entries) > self.size):
+            self.entries.popitem(False)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if(entry == None and self.path != None):
+            entry = self.connect().execute("SELECT output, status, steps, linenum, message FROM results WHERE key = ?", (key,)).fetchone()
+        if(entry == None):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.remember(key, tuple(entry))
+        return entry
+
+    def put(self, key, entry):
+        self.remember(key, entry)
+        if(self.path != None):
+            with self.connect() as database:
+                database.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", (key,) + entry)
+
+    def run(self, program, inp, limits, execute):
+        key = self.key(program, inp, limits)
+        entry = self.get(key)
+        if(entry == None):
+            try:
+                result = execute()
+            except (ExecutionError, ValidationError) as e:
+                self.put(key, (None, type(e).__name__, None, e.linenum, e.message))
+                raise
+            if(result.status != "time-limit"):
+                # Hexadecimal has no limit on the number of digits; int(output, 0) reads decimal entries too
+                self.put(key, (None if result.output == None else hex(result.output), result.status, str(result.steps), None, result.message))
+            return result
+        (output, status, steps, linenum, message) = entry
+        if(status in self.ERRORS):
+            raise self.ERRORS[status](linenum, message)
+        return Result(None if output == None else int(output, 0), status, int(steps), None, message)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits" : self.hits, "misses" : self.misses, "ratio" : self.hits / total if total else 0.0, "entries" : len(self.entries)}
+
+
+# The logarithmic cost of an instruction is the sum of the lengths (in bits,
+# at least 1) of its address or constant and of all the values it works with.
+# Its uniform cost is 1; empty lines and comments cost nothing.
+
+class Profile():
+    JPOS, JZERO, JNEG = 8, 9, 10
+
+    def __init__(self, program):
+        self.program = program
+        code = program.code
+        self.counts = [0] * len(code)
+        self.taken = [0] * len(code)
+        self.costs = [0] * len(code)
+        self.highest = None
+        self.steps = 0
+        self.kinds = [0] * len(code)
+        self.static = [0] * len(code)
+        for pc in range(1, len(code)):
+            instruction = code[pc]
+            name = instruction.instruction
+            if(name in ["PASS", "END"]):
+                continue
+            if(name in ["JUMP", "HALT"]):
+                self.static[pc] = 1
+            elif(instruction.arg != None and name not in ["JPOS", "JZERO", "JNEG"]):
+                self.static[pc] = abs(instruction.arg).bit_length() or 1
+            if(name in ["JPOS", "JZERO", "JNEG"]):
+                self.kinds[pc] = getattr(self, name)
+            elif(name == "HALF"):
+                self.kinds[pc] = 1
+            elif(name in ["LOAD", "ADD", "SUB"] and instruction.type != "constant"):
+                self.kinds[pc] = (2 if instruction.type == "direct" else 4) + (name != "LOAD")
+            elif(name in ["ADD", "SUB"]):
+                self.kinds[pc] = 1
+            elif(name == "STORE"):
+                self.kinds[pc] = 1 if instruction.type == "direct" else 3
+            elif(name == "READ"):
+                self.kinds[pc] = 6 if instruction.type == "direct" else 7
+
+    def touch(self, address):
+        if(self.highest == None or address > self.highest):
+            self.highest = address
+
+    def highestRegister(self):
+        highest = self.highest
+        for pc in range(1, len(self.counts)):
+            instruction = self.program.code[pc]
+            if(self.counts[pc] and (instruction.type == "indirect" or (instruction.type == "direct" and instruction.instruction not in ["READ", "JUMP", "JPOS", "JZERO", "JNEG"]))):
+                if(highest == None or instruction.arg > highest):
+                    highest = instruction.arg
+        return highest
+
+    def uniformCost(self):
+        return sum(self.counts[pc] for pc in range(1, len(self.counts)) if self.program.code[pc].instruction not in ["PASS", "END"])
+
+    def logarithmicCost(self):
+        return sum(self.costs)
+
+    def edges(self, block):
+        end = self.program.code[block.end]
+        following = block.end + 1 if block.end + 1 < len(self.program.instructions) else 0
+        if(end.instruction in ["JPOS", "JZERO", "JNEG"]):
+            return [(end.arg, self.taken[block.end]), (following, self.counts[block.end] - self.taken[block.end])]
+        if(end.instruction == "JUMP"):
+            return [(end.arg, self.counts[block.end])]
+        if(end.instruction == "HALT"):
+            return []
+        return [(following, self.counts[block.end])]
+
+    def blocks(self):
+        blocks = []
+        for block in self.program.graph.blocks.values():
+            if(self.counts[block.start]):
+                steps = sum(self.counts[block.start:block.end + 1])
+                blocks.append({"start" : block.start, "end" : block.end, "executions" : self.counts[block.start], "steps" : steps})
+        return sorted(blocks, key = lambda block : -block["steps"])
+
+    def loops(self):
+        loops = {}
+        for block in self.program.graph.blocks.values():
+            for (target, count) in self.edges(block):
+                if(0 < target <= block.end and count):
+                    (end, iterations) = loops.get(target, (block.end, 0))
+                    loops[target] = (max(end, block.end), iterations + count)
+        result = []
+        for (header, (end, iterations)) in loops.items():
+            steps = sum(self.counts[header:end + 1])
+            result.append({"start" : header, "end" : end, "iterations" : iterations, "steps" : steps})
+        return sorted(result, key = lambda loop : -loop["steps"])
+
+    def report(self):
+        lines = []
+        for pc in range(1, len(self.counts)):
+            instruction = self.program.code[pc]
+            if(instruction.instruction in ["PASS", "END"]):
+                continue
+            line = {"line" : instruction.linenum, "instruction" : str(instruction), "count" : self.counts[pc], "cost" : self.costs[pc]}
+            if(self.kinds[pc] >= self.JPOS):
+                line["taken"] = self.taken[pc]
+                line["notTaken"] = self.counts[pc] - self.taken[pc]
+            lines.append(line)
+        return {"steps" : self.steps, "uniformCost" : self.uniformCost(), "logarithmicCost" : self.logarithmicCost(), "highestRegister" : self.highestRegister(), "lines" : lines, "blocks" : self.blocks(), "loops" : self.loops()}
+
+    def describe(self, top = 5):
+        report = self.report()
+        table = ["{:>6} {:<14} {:>12} {:>12} {:>12} {:>14}".format("Line", "Instruction", "Count", "Taken", "Not taken", "Log. cost")]
+        for line in report["lines"]:
+            table.append("{:>6} {:<14} {:>12} {:>12} {:>12} {:>14}".format(line["line"], line["instruction"], line["count"], line.get("taken", ""), line.get("notTaken", ""), line["cost"]))
+        table.append("Hot blocks :")
+        for block in report["blocks"][:top]:
+            table.append("  lines " + str(block["start"]) + "-" + str(block["end"]) + " : " + str(block["executions"]) + " executions, " + str(block["steps"]) + " steps")
+        table.append("Loops :")
+        for loop in report["loops"][:top]:
+            table.append("  lines " + str(loop["start"]) + "-" + str(loop["end"]) + " : " + str(loop["iterations"]) + " iterations, " + str(loop["steps"]) + " steps")
+        table.append("Steps : " + str(report["steps"]))
+        table.append("Uniform cost : " + str(report["uniformCost"]))
+        table.append("Logarithmic cost : " + str(report["logarithmicCost"]))
+        table.append("Highest register address : " + str(report["highestRegister"]))
+        return table
+
+
+class Program():
+    def __init__(self, instructions):
+        self.instructions = instructions
+        self.graph = ControlFlowGraph(instructions).verify()
+        end = Instruction()
+        end.instruction = "END"
+        end.steps = 0
+        self.code = instructions + [end]
+        self.compiler = None
+        self.fastCompiler = None
+        self.optimizedCode = None
+        self.loops = None
+        self.digest = None
+
+    def __len__(self):
+        return len(self.instructions) - 1
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["compiler"] = None
+        state["fastCompiler"] = None
+        return state
+
+    def hash(self):
+        if(self.digest == None):
+            self.digest = hashlib.sha256("\n".join(str(instruction) for instruction in self.instructions[1:]).encode()).hexdigest()
+        return self.digest
+
+    def optimized(self):
+        if(self.optimizedCode == None):
+            self.optimizedCode = Optimizer(self).optimize()
+        return self.optimizedCode
+
+    def summarized(self):
+        if(self.loops == None):
+            self.loops = LoopSummarizer(self).summarize()
+        return self.loops
+
+    def compiled(self, fast = False):
+        if(fast):
+            # registers addressed indirectly cannot be kept in variables
+            if(self.fastCompiler == None and all(instruction.type != "indirect" for instruction in self.instructions[1:])):
+                self.fastCompiler = Compiler(self, registerWidth(self)).compile()
+            return self.fastCompiler
+        if(self.compiler == None):
+            self.compiler = Compiler(self).compile()
+        return self.compiler
+
+
+# A cached program consists of a header (magic, number of instructions) and of
+# packed little-endian arrays of the arguments (int64), the line numbers
+# (uint32), the opcodes and the addressing modes (uint8), followed by the
+# arguments which do not fit into 64 bits as decimal strings and by a CRC32 of
+# everything before it. The bits 0-1 of a mode are the type of the argument
+# (none, direct, indirect, constant), the bit 2 is set if there is an argument
+# and the bit 3 if it is stored at the end. The files are named by the SHA-256
+# of the source text; the least recently used ones are removed when the cache
+# grows over its size.
+
+class ProgramCache():
+    MAGIC = b"RAMP\x01\x00\x00\x00"
+    TYPES = [None, "direct", "indirect", "constant"]
+
+    def __init__(self, directory, size = 1 << 26):
+        self.directory = directory
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".ramp")
+
+    def encode(self, instructions):
+        count = len(instructions) - 1
+        args = array('q', [0] * count)
+        lines = array('I', [0] * count)
+        opcodes = bytearray(count)
+        modes = bytearray(count)
+        big = []
+        for i in range(count):
+            instruction = instructions[i + 1]
+            lines[i] = instruction.linenum
+            opcodes[i] = keys.index(instruction.instruction)
+            modes[i] = self.TYPES.index(instruction.type)
+            if(instruction.arg != None):
+                modes[i] |= 4
+                if(instruction.arg < 1 << 63):
+                    args[i] = instruction.arg
+                else:
+                    modes[i] |= 8
+                    big.append(struct.pack("<II", i, len(str(instruction.arg))) + str(instruction.arg).encode())
+        if(sys.byteorder != "little"):
+            args.byteswap()
+            lines.byteswap()
+        data = self.MAGIC + struct.pack("<Q", count) + args.tobytes() + lines.tobytes() + bytes(opcodes) + bytes(modes) + struct.pack("<I", len(big)) + b"".join(big)
+        return data + struct.pack("<I", zlib.crc32(data))
+
+    def decode(self, data):
+        # the views must be released before the mapped file is closed
+        views = [memoryview(data)]
+        def view(start, end, format = 'B'):
+            views.append(views[0][start:end])
+            views.append(views[-1].cast(format))
+            return views[-1]
+        try:
+            size = len(views[0])
+            if(size < 24 or views[0][:8] != self.MAGIC or struct.unpack_from("<I", data, size - 4)[0] != zlib.crc32(views[0][:-4])):
+                raise ValueError("Invalid cached program")
+            (count,) = struct.unpack_from("<Q", data, 8)
+            start = 16 + 8 * count
+            args = view(16, start, 'q')
+            lines = view(start, start + 4 * count, 'I')
+            opcodes = view(start + 4 * count, start + 5 * count)
+            modes = view(start + 5 * count, start + 6 * count)
+            if(sys.byteorder != "little"):
+                (args, lines) = (array('q', args), array('I', lines))
+                args.byteswap()
+                lines.byteswap()
+            instructions = [None]
+            types = self.TYPES
+            for (opcode, mode, arg, linenum) in zip(opcodes.tolist(), modes.tolist(), args.tolist(), lines.tolist()):
+                instruction = Instruction()
+                instruction.instruction = keys[opcode]
+                instruction.type = types[mode & 3]
+                instruction.arg = arg if mode & 4 else None
+                instruction.linenum = linenum
+                instructions.append(instruction)
+            pos = start + 6 * count
+            (big,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            for _ in range(big):
+                (i, length) = struct.unpack_from("<II", data, pos)
+                instructions[i + 1].arg = int(data[pos + 8:pos + 8 + length])
+                pos += 8 + length
+            return instructions
+        finally:
+            for buffer in reversed(views):
+                buffer.release()
+
+    def load(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as data:
+                    instructions = self.decode(data)
+            os.utime(path)
+        except (OSError, ValueError, struct.error, IndexError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return instructions
+
+    def store(self, key, instructions):
+        os.makedirs(self.directory, exist_ok = True)
+        path = self.path(key)
+        tmp = path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.encode(instructions))
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if(name.endswith(".ramp")):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                    files.append((stat.st_mtime, stat.st_size, name))
+                except OSError:
+                    pass
+        total = sum(size for (_, size, _) in files)
+        for (_, size, name) in sorted(files):
+            if(total <= self.size):
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def parse(self, source = None, path = None):
+        if(path != None):
+            with open(path) as f:
+                text = f.read()
+        elif(source == None):
+            text = sys.stdin.read()
+        else:
+            text = source if isinstance(source, str) else source.read()
+        key = self.key(text)
+        instructions = self.load(key)
+        if(instructions != None):
+            return Program(instructions)
+        program = Program(Parser(text).getCode())
+        try:
+            self.store(key, program.instructions)
+        except OSError:
+            pass
+        return program
+
+
+# Input registers can also be read from a file (or a pipe). A text file
+# contains numbers separated by white space and is converted once into an
+# array of machine integers (or into a list of Python integers if some of them
+# do not fit into 64 bits). A binary file consists of little-endian signed
+# 64-bit integers; it is mapped into memory and a value is read only when the
+# program reads its input register.
+
+class Inputs():
+    def __init__(self, values, source = None):
+        self.values = values
+        self.source = source
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __str__(self):
+        return str(len(self.values)) + " values" + (" from " + self.source if self.source != None else "")
+
+def readInputs(path):
+    values = array('q')
+    rest = b""
+    with open(path, "rb") as f:
+        while(True):
+            block = f.read(1 << 20)
+            words = (rest + block).split()
+            rest = words.pop() if block and words and not block[-1:].isspace() else b""
+            if(words and not b"".join(words).isdigit()):
+                for word in words:
+                    if(not word.isdigit()):
+                        raise InputError(None, "Invalid non-numeric argument " + word.decode(errors = "replace"))
+            start = len(values)
+            try:
+                values.extend(map(int, words))
+            except OverflowError:
+                values = list(values)
+                values.extend(int(word) for word in words[len(values) - start:])
+            if(not block):
+                return Inputs(values, path)
+
+def mapInputs(path):
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # a pipe or an empty file cannot be mapped
+            data = f.read()
+    if(len(data) % 8):
+        raise InputError(None, "The size of the binary input file " + path + " is not a multiple of 8 bytes")
+    if(sys.byteorder == "little"):
+        return Inputs(memoryview(data).cast('q'), path)
+    values = array('q', bytes(data))
+    values.byteswap()
+    return Inputs(values, path)
+
+def parse(source = None, path = None, cache = None):
+    if(cache != None):
+        return cache.parse(source, path)
+    return Program(Parser(source, path).getCode())
+
+def run(program, inputs = (), limits = None, compiled = False, registers = None, optimized = False, summarized = False, profile = None, checkpoint = None, cache = None, trace = None, fast = False):
+    if(isinstance(inputs, Inputs)):
+        inp = inputs
+    else:
+        # integers are not converted to decimal, which Python limits to 4300 digits
+        inp = [i if type(i) == int and i >= 0 else str(i) for i in inputs]
+        for i in inp:
+            if(type(i) == str and not i.isnumeric()):
+                raise InputError(None, "Invalid non-numeric argument " + i)
+        inp = [int(i) for i in inp]
+    if(cache != None and profile == None and checkpoint == None and trace == None):
+        return cache.run(program, inp, limits, lambda : run(program, inp, limits, compiled, registers, optimized, summarized, fast = fast))
+    if(fast):
+        ram = FastRAM(program, inp, registers, limits, summarized)
+    elif(compiled):
+        ram = CompiledRAM(program, inp, registers, limits, summarized)
+    else:
+        ram = RAM(program, inp, registers, limits, optimized, summarized)
+    try:
+        if(profile != None):
+            output = ram.profile(profile)
+        elif(trace != None):
+            output = ram.record(trace)
+        else:
+            output = ram.execute(checkpoint)
+    except LimitError as e:
+        return Result(None, e.status, ram.steps, ram.reg, str(e))
+    return Result(output, "ok", ram.steps, ram.reg)
+
+# The lockstep engine keeps the data registers of all lanes (input vectors) in
+# a matrix indexed by [lane, register] and executes one instruction at a time
+# for all lanes whose program counter points to it, always choosing the lowest
+# program counter so that lanes which left a loop wait for the others. A lane
+# is handed over to the scalar interpreter (with its current state) when its
+# value would not fit into 64 bits, when it uses an indirect address outside of
+# the matrix or would raise an error, and when there are too few lanes left at
+# the same instruction to make a vector operation worth it.
+
+def importNumpy():
+    global numpy
+    if(numpy == None):
+        try:
+            import numpy
+        except ImportError:
+            return None
+    return numpy
+
+class VectorRAM():
+    def __init__(self, program, vectors, limits = None, compiled = False, minimum = 8, width = 4096):
+        if(importNumpy() == None):
+            raise ImportError("The vectorized engine needs NumPy")
+        self.program = program
+        self.vectors = [[i if type(i) == int and i >= 0 else str(i) for i in inp] for inp in vectors]
+        self.limits = limits if limits != None else Limits()
+        self.compiled = compiled
+        self.minimum = minimum
+        self.results = [None] * len(self.vectors)
+        self.width = registerWidth(program)
+        lanes = len(self.vectors)
+        size = max([len(inp) for inp in self.vectors] + [1])
+        self.inputs = numpy.zeros((lanes, size), numpy.int64)
+        self.counts = numpy.array([len(inp) for inp in self.vectors], numpy.int64)
+        self.reg = numpy.zeros((lanes, self.width if self.width <= width else 1), numpy.int64)
+        self.used = numpy.zeros(self.reg.shape, bool)
+        self.used[:, 0] = True
+        self.pc = numpy.ones(lanes, numpy.int64)
+        self.steps = numpy.zeros(lanes, numpy.int64)
+        self.active = numpy.ones(lanes, bool)
+        vectorized = self.width <= width and self.limits.seconds == None and self.limits.registers == None and not self.limits.cycles
+        for lane in range(lanes):
+            inp = self.vectors[lane]
+            if(vectorized and all((type(i) == int or i.isnumeric()) and int(i) < 1 << 63 for i in inp) and (program.graph.reads == None or program.graph.reads.arg <= len(inp))):
+                self.inputs[lane, :len(inp)] = [int(i) for i in inp]
+            else:
+                self.active[lane] = False
+                try:
+                    self.results[lane] = run(program, inp, self.limits, compiled)
+                except RAMError as e:
+                    self.results[lane] = e
+
+    def registers(self, lane):
+        return {int(address) : int(self.reg[lane, address]) for address in numpy.flatnonzero(self.used[lane])}
+
+    def scalar(self, lanes):
+        for lane in lanes:
+            ram = (CompiledRAM if self.compiled else RAM)(self.program, self.vectors[lane], None, self.limits)
+            ram.PC = int(self.pc[lane])
+            ram.steps = int(self.steps[lane])
+            ram.reg = self.registers(lane)
+            try:
+                output = ram.execute()
+                self.results[lane] = Result(output, "ok", ram.steps, ram.reg)
+            except LimitError as e:
+                self.results[lane] = Result(None, e.status, ram.steps, ram.reg, str(e))
+            except RAMError as e:
+                self.results[lane] = e
+        self.active[lanes] = False
+
+    def split(self, lanes, bad):
+        if(bad.any()):
+            self.scalar(lanes[bad])
+            return lanes[~bad]
+        return lanes
+
+    def operand(self, instruction, lanes):
+        if(instruction.type == "constant"):
+            if(instruction.arg >= 1 << 63):
+                self.scalar(lanes)
+                return (lanes[:0], None)
+            return (lanes, instruction.arg)
+        if(instruction.type == "direct"):
+            return (lanes, self.reg[lanes, instruction.arg])
+        address = self.reg[lanes, instruction.arg]
+        bad = (address < 0) | (address >= self.reg.shape[1])
+        lanes = self.split(lanes, bad)
+        address = address[~bad]
+        return (lanes, self.reg[lanes, address])
+
+    def execute(self, pc, lanes):
+        instruction = self.program.code[pc]
+        name = instruction.instruction if pc else "END"
+        reg = self.reg
+        if(self.limits.steps != None and name != "END"):
+            lanes = self.split(lanes, self.steps[lanes] >= self.limits.steps)
+        if(name in ["HALT", "END"]):
+            self.steps[lanes] += name == "HALT"
+            for lane in lanes:
+                self.results[lane] = Result(int(reg[lane, 0]), "ok", int(self.steps[lane]), self.registers(lane))
+            self.active[lanes] = False
+            return
+        if(name in ["JUMP", "JPOS", "JZERO", "JNEG"]):
+            value = reg[lanes, 0]
+            condition = {"JUMP" : True, "JPOS" : value > 0, "JZERO" : value == 0, "JNEG" : value < 0}[name]
+            self.pc[lanes] = numpy.where(condition, instruction.arg, pc + 1)
+            self.steps[lanes] += 1
+            return
+        if(name in ["LOAD", "ADD", "SUB"]):
+            (lanes, value) = self.operand(instruction, lanes)
+            if(name == "LOAD"):
+                reg[lanes, 0] = value
+            else:
+                accumulator = reg[lanes, 0]
+                result = accumulator + value if name == "ADD" else accumulator - value
+                if(name == "ADD"):
+                    overflow = ((accumulator ^ result) & (value ^ result)) < 0
+                else:
+                    overflow = ((accumulator ^ value) & (accumulator ^ result)) < 0
+                lanes = self.split(lanes, overflow)
+                reg[lanes, 0] = result[~overflow]
+        elif(name == "STORE"):
+            if(instruction.type == "direct"):
+                address = instruction.arg
+            else:
+                address = reg[lanes, instruction.arg]
+                bad = (address < 0) | (address >= reg.shape[1])
+                lanes = self.split(lanes, bad)
+                address = address[~bad]
+            reg[lanes, address] = reg[lanes, 0]
+            self.used[lanes, address] = True
+        elif(name == "READ"):
+            if(instruction.type == "direct"):
+                reg[lanes, 0] = self.inputs[lanes, instruction.arg - 1]
+            else:
+                address = reg[lanes, instruction.arg]
+                bad = ~self.used[lanes, instruction.arg] | (address < 1) | (address > self.counts[lanes])
+                lanes = self.split(lanes, bad)
+                reg[lanes, 0] = self.inputs[lanes, address[~bad] - 1]
+        elif(name == "HALF"):
+            reg[lanes, 0] >>= 1
+        self.pc[lanes] += 1
+        self.steps[lanes] += 1
+
+    def run(self):
+        while(True):
+            lanes = numpy.flatnonzero(self.active)
+            if(lanes.size < self.minimum):
+                self.scalar(lanes)
+                return self.results
+            pcs = self.pc[lanes]
+            pc = int(pcs.min())
+            lanes = lanes[pcs == pc]
+            if(lanes.size < self.minimum):
+                self.scalar(lanes)
+            else:
+                self.execute(pc, lanes)
+
+
+def readVectors(path):
+    import json
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if(not line or line[0] == '#'):
+                continue
+            if(line[0] == '['):
+                yield [str(i) for i in json.loads(line)]
+            else:
+                yield line.replace(',', ' ').split()
+
+worker = None
+
+def unlimitDigits():
+    # Registers hold integers of any size, so converting them to decimal must not fail (Python 3.11+ limits it to 4300 digits)
+    if(hasattr(sys, "set_int_max_str_digits")):
+        sys.set_int_max_str_digits(0)
+
+def unlimited(function, *arguments):
+    # The library functions lift the limit only while they convert a value, so
+    # that the programs which use them keep their own limit
+    if(not hasattr(sys, "get_int_max_str_digits")):
+        return function(*arguments)
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        return function(*arguments)
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+def startWorker(program, compiled, paged, limits = None, cache = None):
+    global worker
+    if(compiled):
+        program.compiled()
+    worker = (program, compiled, paged, limits, cache)
+
+def startPoolWorker(program, compiled, paged, limits = None, cache = None):
+    # the worker processes belong to the batch, so the limit is lifted for them
+    unlimitDigits()
+    startWorker(program, compiled, paged, limits, cache)
+
+def runVector(inp):
+    (program, compiled, paged, limits, cache) = worker
+    try:
+        result = run(program, inp, limits, compiled, PagedRegisters() if paged else None, cache = cache)
+        return unlimited(str, result.output) if result.status == "ok" else result.message
+    except RAMError as e:
+        return str(e)
+    except Exception as e:
+        return "Error : " + type(e).__name__ + " : " + str(e)
+
+def registerWidth(program):
+    addresses = [0] + [instruction.arg for instruction in program.instructions[1:] if instruction.instruction in ["LOAD", "ADD", "SUB", "STORE"] and instruction.type != "constant"]
+    addresses += [instruction.arg for instruction in program.instructions[1:] if instruction.instruction == "READ" and instruction.type == "indirect"]
+    return max(addresses) + 1
+
+def vectorLanes(program, lanes, memory = 1 << 27):
+    # Every lane takes 9 bytes per register (the value and the used flag)
+    return max(1, min(lanes, memory // (9 * registerWidth(program))))
+
+def runVectors(program, vectors, compiled, limits):
+    for result in VectorRAM(program, vectors, limits, compiled).run():
+        if(isinstance(result, RAMError)):
+            yield str(result)
+        else:
+            yield unlimited(str, result.output) if result.status == "ok" else result.message
+
+def batch(program, vectors, workers = None, compiled = False, paged = False, chunksize = 16, limits = None, vectorized = False, lanes = 1 << 14, cache = None):
+    if(vectorized and importNumpy() != None):
+        lanes = vectorLanes(program, lanes)
+        chunk = []
+        for inp in vectors:
+            chunk.append(inp)
+            if(len(chunk) == lanes):
+                yield from runVectors(program, chunk, compiled, limits)
+                chunk = []
+        yield from runVectors(program, chunk, compiled, limits)
+        return
+    if(workers == 1):
+        startWorker(program, compiled, paged, limits, cache)
+        for inp in vectors:
+            yield runVector(inp)
+        return
+    # imported here, so that single runs do not pay for starting it
+    import multiprocessing
+    with multiprocessing.Pool(workers, startPoolWorker, (program, compiled, paged, limits, cache)) as pool:
+        yield from pool.imap(runVector, vectors, chunksize)
+
+
+# The server reads requests from a TCP or Unix socket, one JSON object per
+# line, and answers every request with one line when it is finished, so the
+# answers of one connection can come in any order. A request has an "id", the
+# "program" source, a list of input "vectors" (or one vector as "inputs") and
+# optionally "limits" (an object with "steps", "seconds", "registers" and
+# "cycles"), "compiled" and "timeout" in seconds for the whole request.
+# {"cancel" : ID} cancels a request and {"metrics" : true} returns counters and
+# latencies. The vectors are run in chunks by a pool of worker processes, which
+# keep the parsed programs. Every accepted request gets a slot in an array
+# shared with the workers; a worker runs the program in slices of a quarter of
+# a second and stops as soon as the slot no longer holds the number of its
+# request, i.e. when the request is cancelled, has expired or has been answered.
+# At most `jobs` requests are evaluated at once and at most `jobs` more wait
+# for a slot; further requests are rejected, so that the connections are always
+# read and cancellations are never stuck behind the waiting requests.
+
+programs = collections.OrderedDict()
+generations = None
+
+def startServerWorker(shared):
+    global generations
+    unlimitDigits()
+    generations = shared
+
+def serveRun(program, inp, limits, compiled, deadline, slot, generation):
+    ram = CompiledRAM(program, inp, None, limits) if compiled else RAM(program, inp, None, limits)
+    started = time.time()
+    while(True):
+        now = time.time()
+        seconds = 0.25
+        if(limits.seconds != None):
+            seconds = min(seconds, limits.seconds - (now - started))
+        if(deadline != None):
+            seconds = min(seconds, deadline - now)
+        ram.limits = Limits(limits.steps, max(seconds, 0.001), limits.registers, limits.cycles)
+        try:
+            return {"status" : "ok", "output" : ram.execute(), "steps" : ram.steps}
+        except LimitError as e:
+            if(e.status != "time-limit"):
+                return {"status" : e.status, "steps" : ram.steps, "message" : str(e)}
+            linenum = e.linenum
+        now = time.time()
+        if(generations[slot] != generation):
+            return {"status" : "cancelled", "steps" : ram.steps}
+        if(deadline != None and now >= deadline):
+            return {"status" : "timeout", "steps" : ram.steps}
+        if(limits.seconds != None and now - started >= limits.seconds):
+            return {"status" : "time-limit", "steps" : ram.steps, "message" : str(LimitError(linenum, "The program has not stopped after " + str(limits.seconds) + " seconds.", "time-limit"))}
+
+def serveChunk(source, vectors, limits, compiled, deadline, slot, generation):
+    key = hashlib.sha256(source.encode()).hexdigest()
+    if(key not in programs):
+        try:
+            programs[key] = parse(source)
+        except RAMError as e:
+            return (False, str(e))
+        if(len(programs) > 64):
+            programs.popitem(False)
+    program = programs[key]
+    programs.move_to_end(key)
+    results = []
+    for inp in vectors:
+        if(generations[slot] != generation):
+            results.append({"status" : "cancelled"})
+        elif(deadline != None and time.time() >= deadline):
+            results.append({"status" : "timeout"})
+        else:
+            try:
+                results.append(serveRun(program, [str(i) for i in inp], limits, compiled, deadline, slot, generation))
+            except RAMError as e:
+                results.append({"status" : "error", "message" : str(e)})
+    return (True, results)
+
+class Server():
+    def __init__(self, address, workers = None, jobs = 256, timeout = 60.0, limits = None, chunksize = 16):
+        import multiprocessing
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.jobs = jobs
+        self.timeout = timeout
+        self.limits = limits if limits != None else Limits()
+        self.chunksize = chunksize
+        self.generations = multiprocessing.RawArray('q', [-1] * jobs)
+        self.generation = 0
+        self.free = list(range(jobs))
+        self.latencies = collections.deque(maxlen = 1000)
+        self.counts = {"received" : 0, "finished" : 0, "failed" : 0, "cancelled" : 0, "timedOut" : 0, "rejected" : 0, "vectors" : 0, "steps" : 0}
+        self.active = 0
+        self.waiting = 0
+        self.started = None
+        self.executor = None
+        self.slots = None
+
+    async def start(self):
+        # imported here, like multiprocessing, so that runs without -S start faster
+        import asyncio
+        import concurrent.futures
+        loop = asyncio.get_running_loop()
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer = startServerWorker, initargs = (self.generations,))
+        # start all the workers before the first request comes
+        await asyncio.gather(*[loop.run_in_executor(self.executor, time.sleep, 0.01) for _ in range(self.workers)])
+        self.slots = asyncio.Semaphore(self.jobs)
+        self.started = time.monotonic()
+        if(':' in self.address):
+            (host, port) = self.address.rsplit(':', 1)
+            return await asyncio.start_server(self.connection, host or None, int(port), limit = 1 << 24)
+        return await asyncio.start_unix_server(self.connection, self.address, limit = 1 << 24)
+
+    async def serve(self, ready = None):
+        server = await self.start()
+        if(ready != None):
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures = True)
+
+    async def connection(self, reader, writer):
+        import asyncio
+        import json
+        lock = asyncio.Lock()
+        tasks = {}
+        async def send(response):
+            async with lock:
+                writer.write((unlimited(json.dumps, response) + "\n").encode())
+                await writer.drain()
+        def finished(task, key, request):
+            if(tasks.get(key) is task):
+                del tasks[key]
+            if(task.cancelled()):
+                # cancelled while waiting for a slot
+                self.counts["cancelled"] += 1
+                asyncio.ensure_future(send({"id" : request.get("id"), "status" : "cancelled"}))
+        try:
+            while(True):
+                line = await reader.readline()
+                if(not line):
+                    break
+                try:
+                    request = unlimited(json.loads, line)
+                    if(not isinstance(request, dict)):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as e:
+                    await send({"error" : "Invalid request : " + str(e)})
+                    continue
+                if("metrics" in request):
+                    await send(self.metrics())
+                elif("cancel" in request):
+                    task = tasks.get(json.dumps(request["cancel"]))
+                    if(task != None):
+                        task.cancel()
+                elif(self.waiting >= self.jobs):
+                    self.counts["rejected"] += 1
+                    await send({"id" : request.get("id"), "error" : "Server busy : too many requests are waiting"})
+                else:
+                    # The job waits for a slot in its own task, so that the
+                    # connection keeps reading cancellations and metrics
+                    self.counts["received"] += 1
+                    key = json.dumps(request.get("id"))
+                    task = asyncio.ensure_future(self.job(request, send))
+                    tasks[key] = task
+                    task.add_done_callback(lambda task, key = key, request = request : finished(task, key, request))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+
+    async def job(self, request, send):
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        slot = self.free.pop()
+        self.generation += 1
+        self.generations[slot] = self.generation
+        try:
+            await self.evaluate(request, send, slot, self.generation)
+        finally:
+            self.generations[slot] = -1
+            self.free.append(slot)
+            self.slots.release()
+
+    async def evaluate(self, request, send, slot, generation):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self.active += 1
+        response = {"id" : request.get("id")}
+        futures = []
+        try:
+            source = request["program"]
+            vectors = request["vectors"] if "vectors" in request else [request.get("inputs", [])]
+            limits = request.get("limits") or {}
+            limits = Limits(limits.get("steps", self.limits.steps), limits.get("seconds", self.limits.seconds), limits.get("registers", self.limits.registers), limits.get("cycles", self.limits.cycles))
+            timeout = request.get("timeout", self.timeout)
+            deadline = None if timeout == None else time.time() + timeout
+            if(not isinstance(source, str) or any(not isinstance(inp, list) or any(not (type(i) == int and i >= 0 or str(i).isnumeric()) for i in inp) for inp in vectors)):
+                raise ValueError("the program must be a string and the vectors lists of non-negative integers")
+            for start in range(0, len(vectors), self.chunksize):
+                futures.append(loop.run_in_executor(self.executor, serveChunk, source, vectors[start:start + self.chunksize], limits, bool(request.get("compiled")), deadline, slot, generation))
+            results = []
+            for (ok, chunk) in await asyncio.wait_for(asyncio.gather(*futures), None if timeout == None else timeout + 5):
+                if(not ok):
+                    raise RAMError(None, chunk)
+                results += chunk
+            response["results"] = results
+            self.counts["vectors"] += len(results)
+            self.counts["steps"] += sum(result.get("steps", 0) for result in results)
+            if(any(result["status"] == "timeout" for result in results)):
+                self.counts["timedOut"] += 1
+            self.counts["finished"] += 1
+        except asyncio.CancelledError:
+            self.counts["cancelled"] += 1
+            response["status"] = "cancelled"
+        except asyncio.TimeoutError:
+            self.counts["timedOut"] += 1
+            response["status"] = "timeout"
+        except RAMError as e:
+            self.counts["failed"] += 1
+            response["error"] = e.message
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            self.counts["failed"] += 1
+            response["error"] = "Invalid request : " + ("missing " + str(e) if isinstance(e, KeyError) else str(e))
+        finally:
+            self.generations[slot] = -1
+            for future in futures:
+                future.cancel()
+            self.active -= 1
+        self.latencies.append(time.monotonic() - started)
+        try:
+            await send(response)
+        except ConnectionError:
+            pass
+
+    def metrics(self):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        metrics = dict(self.counts)
+        metrics.update({"running" : self.active, "waiting" : self.waiting, "workers" : self.workers, "uptime" : uptime, "jobsPerSecond" : self.counts["finished"] / uptime if uptime else 0.0, "vectorsPerSecond" : self.counts["vectors"] / uptime if uptime else 0.0})
+        metrics["latency"] = {"mean" : sum(latencies) / len(latencies) if latencies else 0.0, "p50" : percentile(0.5), "p95" : percentile(0.95), "max" : latencies[-1] if latencies else 0.0}
+        return {"metrics" : metrics}
+
+def option(short, long):
+    found = False
+    for name in [short, long]:
+        while name in sys.argv[1:]:
+            sys.argv.remove(name)
+            found = True
+    return found
+
+def value(short, long):
+    for name in [short, long]:
+        if(name in sys.argv[1:]):
+            index = sys.argv.index(name, 1)
+            if(index + 1 == len(sys.argv)):
+                print("Error : Missing value of the option " + name)
+                exit(1)
+            found = sys.argv[index + 1]
+            del sys.argv[index:index + 2]
+            return found
+    return None
+
+def printHelp():
     print(">>> Random access machine simulator <<<")
-    print("Run with: python3 RAM.py [INPUT_REGISTERS_LIST] [-h/--help] [-i/--instructions] [-d/--debug] < RAM_PROGRAM_FILE")
+    print("Run with: python3 RAM.py [INPUT_REGISTERS_LIST] [-h/--help] [-i/--instructions] [-I/--input-file FILE] [-B/--binary-input FILE] [-d/--debug] [-t/--trace] [-D/--debugger] [-c/--compile] [-F/--fast] [-o/--optimize] [-l/--loops] [-p/--paged] [-s/--stats] [-g/--graph] [-f/--profile] [-j/--json FILE] [-m/--max-steps N] [-T/--max-time SECONDS] [-R/--max-registers N] [-C/--cycles] [-k/--checkpoint FILE] [-e/--every N[s]] [-r/--resume] [-b/--batch FILE] [-w/--workers N] [-v/--vector] [-x/--cache DIR] [-u/--memo] [-U/--memo-file FILE] [-S/--serve ADDRESS] [-W/--write-trace FILE] [-q/--query FILE QUERY] < RAM_PROGRAM_FILE")
     print("\nwhere:\n")
     print(">>> -h : prints a brief help")
     print(">>> -i : prints a list of instructions and their usage")
-    print(">>> -d : runs machine in the debug mode")
+    print(">>> -I FILE : reads the input registers from FILE (numbers separated by white space) instead of the command line")
+    print(">>> -B FILE : reads the input registers from FILE of little-endian signed 64-bit integers")
+    print(">>> -d : runs machine in the debug mode, which prints the state of the machine after every step (-t does the same)")
+    print(">>> -D : runs machine in the interactive debugger (commands are read from the terminal, type 'help' to list them)")
+    print(">>> -c : compiles the program before running it (much faster for long computations)")
+    print(">>> -F : compiles the program and keeps the data registers in variables while their values fit into 64 bits")
+    print(">>> -p : stores data registers in compact pages instead of a dictionary")
+    print(">>> -s : prints the number of used data registers and their memory usage")
+    print(">>> -o : fuses common instruction sequences into superinstructions before interpreting the program")
+    print(">>> -l : skips simple counting loops by computing their number of iterations directly")
+    print(">>> -g : prints the basic blocks of the program and its unreachable lines instead of running it")
+    print(">>> -f : prints how many times every line was executed, the hot blocks and loops and the uniform and logarithmic cost of the run")
+    print(">>> -j FILE : writes the same profile as a JSON report to FILE")
+    print(">>> -m N : stops the program after N steps")
+    print(">>> -T SECONDS : stops the program after the given number of seconds")
+    print(">>> -R N : stops the program when it uses more than N data registers")
+    print(">>> -C : stops the program as soon as it is proven that it will never stop")
+    print(">>> -k FILE : periodically saves the state of the machine to FILE.0 and FILE.1")
+    print(">>> -e N : saves the state every N steps, or every N seconds if N ends with 's' (every 60 seconds by default)")
+    print(">>> -r : continues from the newest valid state saved by -k (if the program and the inputs are the same)")
+    print(">>> -b FILE : runs the program once for every line of FILE, which contains input registers separated by commas or spaces (or a JSON list)")
+    print(">>> -w N : number of worker processes used with -b (the number of CPUs by default)")
+    print(">>> -v : runs all lines of the -b FILE in lockstep with NumPy arrays in a single process (if NumPy is installed)")
+    print(">>> -u : remembers the results of the program for the inputs and limits it was run with (useful with -b)")
+    print(">>> -U FILE : remembers the results also in the SQLite database FILE, so that they are reused by later runs")
+    print(">>> -x DIR : keeps parsed programs in DIR and loads an unchanged program from it instead of parsing it again")
+    print(">>> -W FILE : writes a binary trace of the run to FILE")
+    print(">>> -q FILE QUERY : answers a QUERY about the run traced in FILE: 'info', 'state N', 'writes rX' or 'first rX<Y' (also <=, >, >=, ==, !=)")
+    print(">>> -S ADDRESS : runs a server which evaluates JSON requests sent to ADDRESS (HOST:PORT or the path of a Unix socket) with -w worker processes")
     print("\n>>> EXAMPLE : python3 RAM.py 1 2 < prog")
     print("where the file prog contains this code:\n")
     print("# The content of the line after '#' will be ignored")
@@ -458,9 +3047,8 @@ if('-h' in sys.argv[1:] or '--help' in sys.argv[1:]):
     print("ADD =1 # r0 <- r0 + 1")
     print("# a value which is stored in r0 corresponds to the RAM's output\n")
     print("Output: 4") 
-    exit(0)
 
-if('-i' in sys.argv[1:] or '--instructions' in sys.argv[1:]):
+def printInstructions():
     print(">>> Random access machine simulator <<<")
     print("Types of arguments :")
     print("X : direct address of a register (or a line of the code)")
@@ -468,7 +3056,7 @@ if('-i' in sys.argv[1:] or '--instructions' in sys.argv[1:]):
     print("=X : constant (or a line of the code)")
     print("Instructions:\n")
     print("HALT : stops execution of the code")
-    print("HALF : divides a value in r0 by 2 and floors the value")
+    print("HALF : divides a value in r0 by 2 and floors the value (rounds it down, so HALF of -5 is -3)")
     print("READ X : puts a value which is stored in the input register X to r0")
     print("READ (X) : gets a value Y which is stored in rX and puts a value which is stored in the input register Y to r0")
     print("STORE X : puts the value which is stored in r0 to rX")
@@ -490,32 +3078,159 @@ if('-i' in sys.argv[1:] or '--instructions' in sys.argv[1:]):
     print("SUB X : subtracts the value which is stored in rX from r0")
     print("SUB (X) : gets a value Y which is stored in rX and subtracts a value which is stored in rY from r0")
     print("SUB =X : subtracts the value X from r0")
-    exit(0)
 
-if('-d' in sys.argv[1:] or '--debug' in sys.argv[1:]):
-    if '-d' in sys.argv:
-        sys.argv.remove('-d')
-    if '--debug' in sys.argv:
-        sys.argv.remove('--debug')
+def main():
+    unlimitDigits()
+    if(option('-h', '--help')):
+        printHelp()
+        exit(0)
+    if(option('-i', '--instructions')):
+        printInstructions()
+        exit(0)
+
+    inputFile = value('-I', '--input-file')
+    binaryFile = value('-B', '--binary-input')
+    debug = option('-d', '--debug')
+    trace = option('-t', '--trace')
+    debugger = option('-D', '--debugger')
+    compiled = option('-c', '--compile')
+    fast = option('-F', '--fast')
+    paged = option('-p', '--paged')
+    stats = option('-s', '--stats')
+    graph = option('-g', '--graph')
+    optimized = option('-o', '--optimize')
+    summarized = option('-l', '--loops')
+    profiled = option('-f', '--profile')
+    report = value('-j', '--json')
+    steps = value('-m', '--max-steps')
+    seconds = value('-T', '--max-time')
+    maxRegisters = value('-R', '--max-registers')
+    cycles = option('-C', '--cycles')
+    checkpoint = value('-k', '--checkpoint')
+    interval = value('-e', '--every')
+    resume = option('-r', '--resume')
+    vectors = value('-b', '--batch')
+    workers = value('-w', '--workers')
+    vectorized = option('-v', '--vector')
+    cache = value('-x', '--cache')
+    memo = option('-u', '--memo')
+    memoFile = value('-U', '--memo-file')
+    serve = value('-S', '--serve')
+    traced = value('-W', '--write-trace')
+    query = value('-q', '--query')
+
+    if(query != None):
+        try:
+            for line in TraceReader(query).query(sys.argv[1:]):
+                print(line)
+        except (OSError, ValueError) as e:
+            print("Error : " + str(e))
+            exit(1)
+        return
+
+    if(workers != None and (not workers.isnumeric() or int(workers) < 1)):
+        print("Error : Invalid number of workers " + workers)
+        exit(1)
+
+    for (name, limit) in [("steps", steps), ("seconds", seconds), ("registers", maxRegisters)]:
+        if(limit != None and not limit.replace('.', '', name == "seconds").isnumeric()):
+            print("Error : Invalid maximal number of " + name + " " + limit)
+            exit(1)
+    limits = Limits(int(steps) if steps else None, float(seconds) if seconds else None, int(maxRegisters) if maxRegisters else None, cycles)
+
+    if(interval != None and (not interval.rstrip('s').isnumeric() or int(interval.rstrip('s')) < 1)):
+        print("Error : Invalid checkpoint interval " + interval)
+        exit(1)
+
     for i in sys.argv[1:]:
         if(not i.isnumeric()):
                 print("Error : Invalid non-numeric argument " + i)
+                print("Rerun with 'python3 RAM.py -h' to see a brief help")
                 exit(1)
-    parser = Parser()
-    parser.getCode()
-    ram = RAM(parser.getCode(), sys.argv[1:])
-    print(">>> Debugging mode <<<")
-    print("-----------------------")
-    ram.debug()
-    exit(0)
-
-for i in sys.argv[1:]:
-    if(not i.isnumeric()):
-            print("Error : Invalid non-numeric argument " + i)
-            print("Rerun with 'python3 RAM.py -h' to see a brief help")
+
+    inputs = sys.argv[1:]
+    if(inputFile != None or binaryFile != None):
+        if(inputs or (inputFile != None and binaryFile != None)):
+            print("Error : The input registers can be given only once (on the command line, with -I or with -B)")
             exit(1)
+        try:
+            inputs = readInputs(inputFile) if inputFile != None else mapInputs(binaryFile)
+        except OSError as e:
+            print("Error : Cannot read the input registers : " + str(e))
+            exit(1)
+        except InputError as e:
+            print(e)
+            exit(1)
+
+    if(serve != None):
+        import asyncio
+        server = Server(serve, int(workers) if workers else None, 256, 60.0, limits)
+        try:
+            asyncio.run(server.serve(lambda listening : print("Listening on " + serve + " with " + str(server.workers) + " workers", flush = True)))
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print("Error : Cannot listen on " + serve + " : " + str(e))
+            exit(1)
+        return
 
-parser = Parser()
+    registers = PagedRegisters() if paged else {}
+    results = ResultCache(4096, memoFile) if memo or memoFile != None else None
+    try:
+        program = parse(sys.stdin, None, ProgramCache(cache) if cache != None else None)
+        if(graph):
+            for line in program.graph.describe():
+                print(line)
+            return
+        if(vectors != None):
+            for output in batch(program, readVectors(vectors), int(workers) if workers else None, compiled, paged, 16, limits, vectorized, 1 << 14, results):
+                print(output)
+            return
+        if(debugger):
+            try:
+                commands = open("/dev/tty")
+            except OSError:
+                print("Error : The debugger reads its commands from a terminal, but there is none")
+                exit(1)
+            print(">>> Debugger <<<")
+            with commands:
+                Debugger(RAM(program, inputs, registers), commands).session()
+        elif(debug or trace):
+            print(">>> Debugging mode <<<")
+            print("-----------------------")
+            RAM(program, inputs, registers).debug()
+        else:
+            profile = Profile(program) if profiled or report != None else None
+            if(checkpoint != None):
+                if(interval == None or interval.endswith('s')):
+                    checkpoint = Checkpointer(checkpoint, None, int(interval.rstrip('s')) if interval else None, resume)
+                else:
+                    checkpoint = Checkpointer(checkpoint, int(interval), None, resume)
+            result = run(program, inputs, limits, compiled, registers, optimized, summarized, profile, checkpoint, results, TraceWriter(traced) if traced != None else None, fast)
+            if(result.status != "ok"):
+                print(result.message)
+                exit(1)
+            print(result.output)
+            if(profiled):
+                for line in profile.describe():
+                    print(line)
+            if(report != None):
+                import json
+                with open(report, "w") as f:
+                    json.dump(profile.report(), f, indent = 1)
+    except RAMError as e:
+        print(e)
+        exit(1)
+    if(stats):
+        if(not debug and not trace and not debugger):
+            print("Steps : " + str(result.steps))
+        if(results != None):
+            print("Remembered results : " + str(results.hits) + " hits, " + str(results.misses) + " misses")
+        if(results != None and not debug and not trace and not debugger and result.registers == None):
+            return
+        usage = registerStats(registers)
+        print("Registers used : " + str(usage["registers"]))
+        print("Register memory : " + str(usage["memory"]) + " bytes")
 
-ram = RAM(parser.getCode(), sys.argv[1:])
-print(ram.run())
\ No newline at end of file
+if(__name__ == '__main__'):
+    main()
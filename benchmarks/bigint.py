@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the arithmetic with large operands
+#
+# Run with: python3 benchmarks/bigint.py [NUMBER_OF_BITS ...]
+#
+# Builds the number 2^n - 1 by repeated doubling and halves it back to 0,
+# counting the halvings, in every engine, and checks that the output is n.
+# The paged registers only save memory; they convert every value between an
+# array and a Python integer, so they are slower than the compiled program.
+# The fast engine keeps the registers in variables until the doubling passes
+# 2^63 and then continues with the compiled program, so the sizes of 62 and 64
+# bits check both sides of the overflow.
+# Then it compares the exact HALF (a shift by one bit) with the division
+# through a float which the simulator used before: how long one HALF takes,
+# how many results of the float division lost precision and how many failed
+# because the value does not fit into a float.
+#
+
+import os
+import random
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+
+import RAM
+
+source = """READ 1
+STORE 1
+LOAD 1
+JZERO 12
+SUB =1
+STORE 1
+LOAD 2
+ADD 2
+ADD =1
+STORE 2
+JUMP 3
+LOAD 2
+JZERO 20
+HALF
+STORE 2
+LOAD 3
+ADD =1
+STORE 3
+JUMP 12
+LOAD 3
+"""
+
+engines = {
+    "interpreter" : {},
+    "optimized" : {"optimized" : True},
+    "compiled" : {"compiled" : True},
+    "fast" : {"fast" : True},
+    "paged" : {"compiled" : True, "paged" : True},
+}
+
+def execute(program, bits, engine):
+    options = dict(engines[engine])
+    if(options.pop("paged", False)):
+        options["registers"] = RAM.PagedRegisters()
+    start = time.perf_counter()
+    result = RAM.run(program, [bits], **options)
+    return (result, time.perf_counter() - start)
+
+def halve(values, exact):
+    start = time.perf_counter()
+    if(exact):
+        for value in values:
+            value >> 1
+    else:
+        for value in values:
+            try:
+                int(value / 2)
+            except OverflowError:
+                pass
+    return (time.perf_counter() - start) / len(values)
+
+def errors(values):
+    # The float division truncated toward zero, so it is compared with the
+    # exact truncated half to count only the results which lost precision
+    inexact = 0
+    overflow = 0
+    for value in values:
+        try:
+            inexact += int(value / 2) != (value >> 1 if value >= 0 else -(-value >> 1))
+        except OverflowError:
+            overflow += 1
+    return (inexact, overflow)
+
+if(__name__ == '__main__'):
+    sizes = [int(arg) for arg in sys.argv[1:]] or [62, 64, 1000, 10000, 30000]
+    program = RAM.parse(source)
+    # the compiled engines translate the program in their first run
+    for engine in engines:
+        execute(program, 1, engine)
+    print("bits".rjust(8) + "".join((engine + " [s]").rjust(16) for engine in engines))
+    for bits in sizes:
+        line = str(bits).rjust(8)
+        for engine in engines:
+            (result, elapsed) = execute(program, bits, engine)
+            assert result.output == bits, (engine, bits, result.output)
+            line += ("%.3f" % elapsed).rjust(16)
+        print(line)
+    print()
+    print("bits".rjust(8) + "shift [ns]".rjust(12) + "float [ns]".rjust(12) + "inexact".rjust(10) + "overflow".rjust(10))
+    generator = random.Random(0)
+    for bits in [32, 53, 54, 64, 256, 1023, 1025, 4096, 100000]:
+        values = [generator.getrandbits(bits) * generator.choice([1, -1]) for i in range(2000)]
+        shift = halve(values, True)
+        division = halve(values, False)
+        (inexact, overflow) = errors(values)
+        print(str(bits).rjust(8) + ("%.1f" % (shift * 1e9)).rjust(12) + ("%.1f" % (division * 1e9) if overflow < len(values) else "-").rjust(12) + ("%.1f%%" % (100.0 * inexact / len(values))).rjust(10) + ("%.1f%%" % (100.0 * overflow / len(values))).rjust(10))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+#
+# Dispatch benchmark of the peephole optimizer
+#
+# Run with: python3 benchmarks/dispatch.py
+#
+# Runs the bundled examples in the interpreter with and without the peephole
+# optimizer and reports how many instruction dispatches the superinstructions
+# saved.
+#
+
+import os
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+
+import RAM
+
+examples = [
+    ("FIB", [5000]),
+    ("MUL", [20000, 30]),
+    ("POW2", [5000]),
+    ("PRIME", [10007]),
+]
+
+def measure(program, inputs, optimized):
+    ram = RAM.RAM(program, [str(i) for i in inputs], None, None, optimized)
+    start = time.perf_counter()
+    output = ram.run()
+    return (output, ram.steps, ram.steps - ram.saved, time.perf_counter() - start)
+
+if(__name__ == '__main__'):
+    print("example".ljust(16) + "steps".rjust(10) + "dispatches".rjust(12) + "saved".rjust(8) + "plain [s]".rjust(11) + "optimized [s]".rjust(15))
+    for (name, inputs) in examples:
+        program = RAM.parse(path = os.path.join(root, "examples", name))
+        plain = measure(program, inputs, False)
+        optimized = measure(program, inputs, True)
+        assert plain[:2] == optimized[:2]
+        saved = 100.0 * (plain[2] - optimized[2]) / plain[2]
+        label = name + " " + " ".join(str(i) for i in inputs)
+        print(label.ljust(16) + str(optimized[1]).rjust(10) + str(optimized[2]).rjust(12) + ("%.1f%%" % saved).rjust(8) + ("%.3f" % plain[3]).rjust(11) + ("%.3f" % optimized[3]).rjust(15))
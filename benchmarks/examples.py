@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+#
+# Benchmark suite of the bundled examples
+#
+# Run with: python3 benchmarks/examples.py [-o RESULTS_FILE] [-n REPEAT] [-E ENGINE,...] [-X EXAMPLE,...] [-Q/--quick]
+#           python3 benchmarks/examples.py compare BASELINE_FILE RESULTS_FILE [-t PERCENT] [-a ALPHA]
+#
+# Runs every bundled example with small, medium and large inputs in every
+# engine of the simulator and reports the parse time, the number of steps, the
+# steps per second and the peak memory (measured by tracemalloc in a separate
+# run, so that the timed runs are not slowed down). The timed runs are repeated
+# in rounds over all the cases and all the samples are saved to the JSON
+# results file.
+#
+# The compare command matches the cases of two results files and flags a case
+# as a regression when it is slower by more than the threshold and a
+# permutation test of the steps per second samples finds the difference
+# significant. It exits with 1 when there is a regression or when an example
+# produced a different output or number of steps.
+#
+
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+
+import RAM
+
+examples = [
+    ("FIB", [[100], [1000], [5000]]),
+    ("MUL", [[1000, 30], [10000, 30], [50000, 30]]),
+    ("POW2", [[200], [1000], [4000]]),
+    ("PRIME", [[1009], [10007], [30011]]),
+]
+
+engines = {
+    "interpreter" : {},
+    "optimized" : {"optimized" : True},
+    "loops" : {"summarized" : True},
+    "compiled" : {"compiled" : True},
+    "compiled-loops" : {"compiled" : True, "summarized" : True},
+    "fast" : {"fast" : True},
+    "paged" : {"compiled" : True, "paged" : True},
+}
+
+def execute(program, inputs, engine):
+    options = dict(engines[engine])
+    if(options.pop("paged", False)):
+        options["registers"] = RAM.PagedRegisters()
+    return RAM.run(program, inputs, **options)
+
+def prepare(name, inputs, engine, repeat):
+    with open(os.path.join(root, "examples", name)) as f:
+        source = f.read()
+    parse = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        program = RAM.parse(source)
+        parse.append(time.perf_counter() - start)
+    # The first run compiles the program and warms up the caches, and short
+    # runs are repeated within one sample so that it takes at least 50 ms
+    start = time.perf_counter()
+    result = execute(program, inputs, engine)
+    number = max(1, math.ceil(0.05 / max(time.perf_counter() - start, 1e-6)))
+    tracemalloc.start()
+    execute(program, inputs, engine)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    case = {
+        "example" : name,
+        "inputs" : inputs,
+        "engine" : engine,
+        "output" : str(result.output),
+        "steps" : result.steps,
+        "parse" : min(parse),
+        "times" : [],
+        "rates" : [],
+        "memory" : peak,
+    }
+    return (case, program, number)
+
+def measure(case, program, number):
+    start = time.perf_counter()
+    for i in range(number):
+        execute(program, case["inputs"], case["engine"])
+    elapsed = (time.perf_counter() - start) / number
+    case["times"].append(elapsed)
+    case["rates"].append(case["steps"] / elapsed)
+
+def mean(values):
+    return sum(values) / len(values)
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def permutation(first, second, samples = 20000):
+    # Two-sided permutation test of the difference of means, exact for small samples
+    observed = abs(mean(first) - mean(second))
+    pooled = first + second
+    count = len(first)
+    extreme = 0
+    total = 0
+    if(math.comb(len(pooled), count) <= samples):
+        splits = itertools.combinations(range(len(pooled)), count)
+    else:
+        generator = random.Random(0)
+        splits = (generator.sample(range(len(pooled)), count) for i in range(samples))
+    for split in splits:
+        chosen = set(split)
+        a = [pooled[i] for i in chosen]
+        b = [pooled[i] for i in range(len(pooled)) if i not in chosen]
+        if(abs(mean(a) - mean(b)) >= observed - 1e-12 * observed):
+            extreme += 1
+        total += 1
+    return extreme / total
+
+def label(case):
+    return case["example"] + " " + " ".join(str(i) for i in case["inputs"])
+
+def report(results):
+    print("example".ljust(16) + "engine".ljust(16) + "steps".rjust(10) + "parse [ms]".rjust(12) + "steps/s".rjust(12) + "memory [kB]".rjust(13))
+    for case in results:
+        print(label(case).ljust(16) + case["engine"].ljust(16) + str(case["steps"]).rjust(10) + ("%.3f" % (case["parse"] * 1000)).rjust(12) + ("%.0f" % median(case["rates"])).rjust(12) + ("%.1f" % (case["memory"] / 1024)).rjust(13))
+    print()
+    print("Fastest engines :")
+    for (key, cases) in itertools.groupby(results, label):
+        best = max(cases, key = lambda case : median(case["rates"]))
+        print("  " + key.ljust(16) + best["engine"])
+
+def benchmark(output, repeat, selected, names, quick):
+    prepared = []
+    for (name, sizes) in examples:
+        if(names != None and name not in names):
+            continue
+        for inputs in sizes[:1] if quick else sizes:
+            cases = [prepare(name, inputs, engine, repeat) for engine in selected]
+            for (case, program, number) in cases:
+                if((case["output"], case["steps"]) != (cases[0][0]["output"], cases[0][0]["steps"])):
+                    print("Error : The engines " + cases[0][0]["engine"] + " and " + case["engine"] + " disagree on " + label(case))
+                    exit(1)
+            prepared += cases
+    # The samples of one case are taken in separate rounds over all the cases,
+    # so that a slow period of the machine does not hit only some of the cases
+    for i in range(repeat):
+        for (case, program, number) in prepared:
+            measure(case, program, number)
+    results = [case for (case, program, number) in prepared]
+    report(results)
+    if(output != None):
+        with open(output, "w") as f:
+            json.dump({
+                "python" : platform.python_version(),
+                "implementation" : platform.python_implementation(),
+                "machine" : platform.machine(),
+                "date" : time.strftime("%Y-%m-%d %H:%M:%S"),
+                "repeat" : repeat,
+                "results" : results,
+            }, f, indent = 1)
+
+def compare(baseline, current, threshold, alpha):
+    with open(baseline) as f:
+        before = {(label(case), case["engine"]) : case for case in json.load(f)["results"]}
+    with open(current) as f:
+        after = json.load(f)["results"]
+    failed = False
+    print("example".ljust(16) + "engine".ljust(16) + "baseline".rjust(12) + "current".rjust(12) + "change".rjust(9) + "p".rjust(8) + "  verdict")
+    for case in after:
+        old = before.get((label(case), case["engine"]))
+        if(old == None):
+            continue
+        change = 100.0 * (mean(case["rates"]) - mean(old["rates"])) / mean(old["rates"])
+        p = permutation(old["rates"], case["rates"])
+        verdict = ""
+        if((case["output"], case["steps"]) != (old["output"], old["steps"])):
+            verdict = "changed result"
+            failed = True
+        elif(p < alpha and change < -threshold):
+            verdict = "regression"
+            failed = True
+        elif(p < alpha and change > threshold):
+            verdict = "faster"
+        print(label(case).ljust(16) + case["engine"].ljust(16) + ("%.0f" % mean(old["rates"])).rjust(12) + ("%.0f" % mean(case["rates"])).rjust(12) + ("%+.1f%%" % change).rjust(9) + ("%.3f" % p).rjust(8) + "  " + verdict)
+    return failed
+
+if(__name__ == '__main__'):
+    threshold = RAM.value("-t", "--threshold")
+    alpha = RAM.value("-a", "--alpha")
+    output = RAM.value("-o", "--output")
+    repeat = RAM.value("-n", "--repeat")
+    selected = RAM.value("-E", "--engines")
+    names = RAM.value("-X", "--examples")
+    quick = RAM.option("-Q", "--quick")
+    if(len(sys.argv) > 1 and sys.argv[1] == "compare"):
+        if(len(sys.argv) != 4):
+            print("Error : The compare command needs a baseline and a results file")
+            exit(1)
+        exit(1 if compare(sys.argv[2], sys.argv[3], float(threshold or 5), float(alpha or 0.05)) else 0)
+    if(len(sys.argv) > 1):
+        print("Error : Unknown argument " + sys.argv[1])
+        exit(1)
+    selected = list(engines) if selected == None else selected.split(",")
+    for engine in selected:
+        if(engine not in engines):
+            print("Error : Unknown engine " + engine + " (choose from " + ", ".join(engines) + ")")
+            exit(1)
+    benchmark(output, int(repeat or 5), selected, None if names == None else names.split(","), quick)
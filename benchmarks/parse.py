@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+#
+# Parse throughput benchmark
+#
+# Run with: python3 benchmarks/parse.py [NUMBER_OF_LINES ...]
+#
+# Generates RAM programs of the given sizes and measures how many lines per
+# second the Scanner and Parser are able to process, and how many lines per
+# second are loaded from the cache of parsed programs instead.
+#
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import RAM
+
+lines = [
+    "READ 1 # r0 = i1",
+    "STORE 1",
+    "LOAD (1)",
+    "ADD =12345",
+    "SUB 2",
+    "",
+    "# a comment line",
+    "JNEG 1",
+    "HALF",
+    "STORE (3)",
+    "JUMP =1",
+    "HALT",
+]
+
+def generate(size):
+    return "\n".join(lines[i % len(lines)] for i in range(size)) + "\n"
+
+def measure(size, repeat = 3):
+    source = generate(size)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prog = RAM.Parser(source).getCode()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    assert len(prog) == size + 1
+    return best
+
+def measureCached(size, directory, repeat = 3):
+    source = generate(size)
+    cache = RAM.ProgramCache(directory)
+    RAM.parse(source, cache = cache)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        program = RAM.parse(source, cache = cache)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    assert cache.hits == repeat and len(program) == size
+    return best
+
+if(__name__ == '__main__'):
+    sizes = [int(i) for i in sys.argv[1:]] if sys.argv[1:] else [1000, 10000, 100000]
+    print("lines".rjust(10) + "seconds".rjust(12) + "lines/s".rjust(14) + "cached".rjust(12) + "lines/s".rjust(14))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            elapsed = measure(size)
+            cached = measureCached(size, directory)
+            print(str(size).rjust(10) + ("%.4f" % elapsed).rjust(12) + ("%.0f" % (size / elapsed)).rjust(14) + ("%.4f" % cached).rjust(12) + ("%.0f" % (size / cached)).rjust(14))
@@ -0,0 +1,37 @@
+#
+# Tests of the command line
+#
+# Run with: python3 -m unittest discover tests
+#
+
+import os
+import subprocess
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def simulate(arguments, example):
+    # Runs the simulator with the arguments and the example on the standard
+    # input and returns its exit code and output
+    with open(os.path.join(root, "examples", example)) as f:
+        process = subprocess.run([sys.executable, os.path.join(root, "RAM.py")] + arguments, stdin = f, capture_output = True, text = True, timeout = 60)
+    return (process.returncode, process.stdout, process.stderr)
+
+class CommandLineTest(unittest.TestCase):
+    def testStats(self):
+        (code, output, errors) = simulate(["2", "3", "-s", "-u"], "MUL")
+        self.assertEqual((code, errors), (0, ""))
+        self.assertEqual(output.splitlines()[:3], ["6", "Steps : 28", "Remembered results : 0 hits, 1 misses"])
+
+    def testStatsOfTrace(self):
+        for arguments in [["-s", "-u", "-t"], ["-s", "-u", "-d"], ["-s", "-t"]]:
+            with self.subTest(arguments = arguments):
+                (code, output, errors) = simulate(["2", "3"] + arguments, "MUL")
+                self.assertEqual((code, errors), (0, ""))
+                self.assertIn("Output : 6", output)
+                self.assertIn("Registers used : 4", output)
+                self.assertNotIn("Steps : ", output)
+
+if(__name__ == '__main__'):
+    unittest.main()
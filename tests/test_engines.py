@@ -0,0 +1,217 @@
+#
+# Tests of the execution engines
+#
+# Run with: python3 -m unittest discover tests
+#
+# Every engine must give the same output, status, number of steps and data
+# registers as the interpreter, or raise the same error.
+#
+
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+
+import RAM
+
+def example(name):
+    with open(os.path.join(root, "examples", name)) as f:
+        return f.read()
+
+def vector(program, inputs, limits):
+    # a single lane is run in lockstep as well when the group minimum is 1
+    result = RAM.VectorRAM(program, [inputs], limits, False, 1).run()[0]
+    if(isinstance(result, RAM.RAMError)):
+        raise result
+    return result
+
+engines = {
+    "compiled" : lambda program, inputs, limits : RAM.run(program, inputs, limits, True),
+    "optimized" : lambda program, inputs, limits : RAM.run(program, inputs, limits, False, None, True),
+    "loops" : lambda program, inputs, limits : RAM.run(program, inputs, limits, False, None, False, True),
+    "compiled-loops" : lambda program, inputs, limits : RAM.run(program, inputs, limits, True, None, False, True),
+    "optimized-loops" : lambda program, inputs, limits : RAM.run(program, inputs, limits, False, None, True, True),
+    "paged" : lambda program, inputs, limits : RAM.run(program, inputs, limits, False, RAM.PagedRegisters()),
+    "compiled-paged" : lambda program, inputs, limits : RAM.run(program, inputs, limits, True, RAM.PagedRegisters()),
+    "fast" : lambda program, inputs, limits : RAM.run(program, inputs, limits, fast = True),
+}
+if(RAM.importNumpy() != None):
+    engines["vector"] = vector
+
+def outcome(engine, source, inputs, limits):
+    try:
+        result = engine(RAM.parse(source), inputs, limits)
+    except RAM.RAMError as e:
+        return (type(e).__name__, str(e))
+    registers = sorted((address, value) for (address, value) in dict(result.registers.items()).items() if value != 0)
+    return (result.output, result.status, result.steps, registers, result.message)
+
+def interpreter(program, inputs, limits):
+    return RAM.run(program, inputs, limits)
+
+class EngineTest(unittest.TestCase):
+    def check(self, source, inputs = (), limits = None):
+        expected = outcome(interpreter, source, inputs, limits)
+        for (name, engine) in engines.items():
+            with self.subTest(engine = name, inputs = inputs):
+                self.assertEqual(outcome(engine, source, inputs, limits), expected)
+        return expected
+
+    def testExamples(self):
+        for (name, vectors) in [("FIB", [[0], [1], [20], [200]]), ("MUL", [[0, 7], [300, 7], [7, 1]]), ("POW2", [[0], [2], [100]]), ("PRIME", [[1], [2], [97], [1000]])]:
+            for inputs in vectors:
+                self.assertEqual(self.check(example(name), inputs)[1], "ok")
+
+    def testEmptyProgram(self):
+        self.assertEqual(self.check(""), (0, "ok", 0, [], None))
+        self.check("\n\n# nothing\n")
+
+    def testJumpOutOfRange(self):
+        self.assertEqual(self.check("LOAD =5\nJUMP 7\n")[0], "ValidationError")
+        self.assertEqual(self.check("JPOS 0\nJZERO =3\nLOAD =4\nJUMP 0\n")[1], "ok")
+
+    def testNegativeRegisters(self):
+        self.check("SUB =3\nSTORE 1\nLOAD =9\nSTORE (1)\nLOAD (1)\nADD (1)\n")
+        self.check("SUB =3\nSTORE 1\nLOAD (1)\n")
+        self.check("READ 1\nSUB =10\nSTORE 2\nREAD (2)\n", [4])
+
+    def testHugeRegisters(self):
+        doubling = "READ 1\nSTORE 1\nLOAD =1\nSTORE 2\nLOAD 1\nJZERO 13\nSUB =1\nSTORE 1\nLOAD 2\nADD 2\nSTORE 2\nJUMP 5\nLOAD 2\nSUB =1\nHALF\n"
+        for bits in [62, 63, 64, 65, 200]:
+            self.assertEqual(self.check(doubling, [bits])[0], (2 ** bits - 1) >> 1)
+        self.check("READ 1\nADD 1\nSTORE 1\nADD 1\nSTORE (1)\n", [2 ** 62])
+        self.check("READ 1\nSUB 1\nSUB 1\nSUB 1\nHALF\nSTORE 2\n", [2 ** 62 + 1])
+        self.check("READ 1\nADD =1\n", [2 ** 63 - 1])
+        self.check("READ 1\nSTORE 1\nLOAD (1)\n", [2 ** 70])
+        self.check("SUB =5\nHALF\nSTORE 1\nSUB =4\nHALF\n")
+
+    def testStepLimits(self):
+        for steps in [0, 1, 5, 50]:
+            self.check("JUMP 1\n", [], RAM.Limits(steps))
+            self.check(example("MUL"), [30, 4], RAM.Limits(steps))
+        self.assertEqual(self.check(example("FIB"), [20], RAM.Limits(10 ** 6))[1], "ok")
+
+    def testRuntimeErrors(self):
+        self.assertEqual(self.check("LOAD =5\nSTORE 1\nREAD (1)\n", [1])[0], "ExecutionError")
+        self.assertEqual(self.check("READ (1)\n", [1])[0], "ExecutionError")
+
+# The loop summarizer replaces a loop by its effect only when it can prove the
+# result, and must leave every other loop to the ordinary execution. Either way
+# the steps and the data registers must be the same as without it.
+
+class LoopTest(unittest.TestCase):
+    def check(self, source, inputs, limits = None):
+        expected = outcome(interpreter, source, inputs, limits)
+        for name in ["loops", "compiled-loops", "optimized-loops"]:
+            with self.subTest(engine = name, inputs = inputs, steps = None if limits == None else limits.steps):
+                self.assertEqual(outcome(engines[name], source, inputs, limits), expected)
+        return expected
+
+    def summarized(self, source):
+        return [pc for (pc, loop) in enumerate(RAM.parse(source).summarized()) if loop != None]
+
+    def testAffineLoop(self):
+        source = "READ 1\nSTORE 1\nLOAD 1\nJZERO 12\nLOAD 2\nADD =3\nSTORE 2\nLOAD 1\nSUB =1\nSTORE 1\nJUMP 3\nLOAD 2\n"
+        self.assertIn(3, self.summarized(source))
+        for n in [0, 1, 2, 10, 10 ** 6]:
+            self.assertEqual(self.check(source, [n])[0], 3 * n)
+        for steps in [0, 3, 4, 5, 40, 41, 1000]:
+            self.check(source, [10 ** 6], RAM.Limits(steps))
+
+    def testNonAffineBody(self):
+        # doubling, halving and adding the counter do not change a register by
+        # the same amount in every iteration
+        doubling = "READ 1\nSTORE 1\nLOAD =1\nSTORE 2\nLOAD 1\nJZERO 14\nSUB =1\nSTORE 1\nLOAD 2\nADD 2\nSTORE 2\nJUMP 5\nPASS\nLOAD 2\n"
+        halving = "READ 1\nSTORE 1\nLOAD 1\nJZERO 8\nHALF\nSTORE 1\nJUMP 3\nLOAD 1\n"
+        triangle = "READ 1\nSTORE 1\nLOAD 1\nJZERO 11\nSUB =1\nSTORE 1\nLOAD 2\nADD 1\nSTORE 2\nJUMP 3\nLOAD 2\n"
+        for source in [doubling, halving, triangle]:
+            self.assertEqual(self.summarized(source), [])
+        self.assertEqual(self.check(doubling, [100])[0], 2 ** 100)
+        self.assertEqual(self.check(halving, [10 ** 9])[0], 0)
+        self.assertEqual(self.check(triangle, [1000])[0], 499500)
+
+    def testIndirectWriteToCounter(self):
+        # r3 points to the counter r1, so STORE (3) decreases it once more;
+        # an odd counter skips zero and the loop never stops
+        source = "READ 1\nSTORE 1\nLOAD =1\nSTORE 3\nLOAD 1\nJZERO 13\nSUB =1\nSTORE 1\nSUB =1\nSTORE (3)\nJUMP 5\nPASS\nLOAD 1\n"
+        self.assertEqual(self.summarized(source), [])
+        for n in [0, 2, 1000]:
+            self.assertEqual(self.check(source, [n])[1], "ok")
+        for n in [1, 7]:
+            self.assertEqual(self.check(source, [n], RAM.Limits(1000))[1], "step-limit")
+
+    def testTripCounts(self):
+        # the counter starts below zero and counts up to it
+        up = "READ 1\nSUB =5\nSTORE 1\nLOAD 1\nJZERO 12\nADD =1\nSTORE 1\nLOAD 2\nADD =1\nSTORE 2\nJUMP 4\nLOAD 2\n"
+        self.assertIn(4, self.summarized(up))
+        for n in [0, 4, 5]:
+            self.assertEqual(self.check(up, [n])[0], 5 - n)
+        for n in [6, 100]:
+            self.assertEqual(self.check(up, [n], RAM.Limits(5000))[1], "step-limit")
+        # the counter decreases by 3, so it hits zero only from a multiple of 3
+        past = "READ 1\nSTORE 1\nLOAD 1\nJZERO 12\nSUB =3\nSTORE 1\nLOAD 2\nADD =1\nSTORE 2\nJUMP 3\nPASS\nLOAD 2\n"
+        for n in [0, 3, 3000]:
+            self.assertEqual(self.check(past, [n])[0], n // 3)
+        for n in [1, 2, 3001]:
+            self.assertEqual(self.check(past, [n], RAM.Limits(5000))[1], "step-limit")
+        # the loop runs at least once and stops below zero
+        below = "READ 1\nSTORE 1\nLOAD 1\nJNEG 12\nSUB =3\nSTORE 1\nLOAD 2\nADD =1\nSTORE 2\nJUMP 3\nPASS\nLOAD 2\n"
+        for n in [0, 1, 2, 3, 3000]:
+            self.assertEqual(self.check(below, [n])[0], n // 3 + 1)
+
+# The fast engine keeps the registers in variables while their values fit into
+# 64 bits and continues in the compiled program with unlimited integers from
+# the instruction which stores a larger value.
+
+class FastTest(unittest.TestCase):
+    def check(self, source, inputs, limits = None):
+        program = RAM.parse(source)
+        expected = RAM.run(program, inputs, limits)
+        with self.subTest(inputs = inputs, steps = None if limits == None else limits.steps):
+            result = RAM.run(program, inputs, limits, fast = True)
+            # also the registers which were set to 0 must be reported as used
+            self.assertEqual((result.output, result.status, result.steps, dict(result.registers)), (expected.output, expected.status, expected.steps, dict(expected.registers)))
+        return result
+
+    def testCrossingMachineIntegers(self):
+        up = "READ 1\nSTORE 1\nADD =1\nSTORE 2\nSUB 2\nSTORE 3\nLOAD 2\nADD 2\nSTORE 4\n"
+        for value in [2 ** 63 - 3, 2 ** 63 - 2, 2 ** 63 - 1, 2 ** 62, 2 ** 64]:
+            self.check(up, [value])
+        down = "READ 1\nSTORE 1\nLOAD =0\nSUB 1\nSTORE 2\nSUB =1\nSTORE 3\nSUB =1\nSTORE 4\n"
+        for value in [2 ** 63 - 2, 2 ** 63 - 1, 2 ** 63, 2 ** 63 + 1]:
+            self.check(down, [value])
+
+    def testGrowingPastMachineIntegers(self):
+        doubling = "READ 1\nSTORE 1\nLOAD =1\nSTORE 2\nLOAD 1\nJZERO 13\nSUB =1\nSTORE 1\nLOAD 2\nADD 2\nSTORE 2\nJUMP 5\nLOAD 2\nSUB =1\nHALF\nSTORE 3\n"
+        for bits in [0, 62, 63, 64, 100]:
+            self.assertEqual(self.check(doubling, [bits]).output, (2 ** bits - 1) >> 1)
+        for steps in [0, 1, 500, 567, 568, 569, 570, 571, 572, 10 ** 6]:
+            self.check(doubling, [70], RAM.Limits(steps))
+        self.assertEqual(self.check(example("FIB"), [200]).output, RAM.run(RAM.parse(example("FIB")), [200]).output)
+
+    def testAccumulatorOnly(self):
+        # the accumulator overflows at the end of a block without a store
+        self.check("READ 1\nADD 0\nADD 0\nJUMP 5\nHALF\nADD =1\n", [2 ** 62])
+        self.check("READ 1\nADD 0\nJPOS 5\nPASS\nSUB =1\n", [2 ** 62])
+        self.check("READ 1\nADD 0\nHALT\n", [2 ** 62])
+        self.check("READ 1\nADD 0\n", [2 ** 62])
+
+    def testZeroRegisters(self):
+        self.check("LOAD =0\nSTORE 3\nSTORE 5\nLOAD =7\nSTORE 4\nSUB 4\nSTORE 4\n", [])
+        self.check(example("MUL"), [30, 4])
+
+class BatchTest(unittest.TestCase):
+    @unittest.skipUnless(hasattr(sys, "get_int_max_str_digits"), "Python limits the digits since 3.11")
+    def testDigitLimitOfCaller(self):
+        # the outputs are converted without lifting the limit of this process
+        program = RAM.parse("READ 1\nSUB =1\n")
+        limit = sys.get_int_max_str_digits()
+        for workers in [1, 2]:
+            outputs = list(RAM.batch(program, [[10 ** 5000], [3]], workers))
+            self.assertEqual(outputs, [RAM.unlimited(str, 10 ** 5000 - 1), "2"])
+            self.assertEqual(sys.get_int_max_str_digits(), limit)
+
+if(__name__ == '__main__'):
+    unittest.main()
@@ -0,0 +1,73 @@
+#
+# Tests of the evaluation server
+#
+# Run with: python3 -m unittest discover tests
+#
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+
+import RAM
+
+with open(os.path.join(root, "examples", "MUL")) as f:
+    MUL = f.read()
+
+class ServerTest(unittest.TestCase):
+    def exchange(self, jobs, requests, answers):
+        # Starts a server with one worker, sends the requests and returns the
+        # answers together with the number of seconds each of them took
+        path = os.path.join(tempfile.mkdtemp(), "ram.sock")
+        server = RAM.Server(path, 1, jobs, 8.0)
+        async def scenario():
+            listening = await server.start()
+            try:
+                (reader, writer) = await asyncio.open_unix_connection(path)
+                started = time.monotonic()
+                for request in requests:
+                    writer.write((json.dumps(request) + "\n").encode())
+                    await writer.drain()
+                    await asyncio.sleep(0.2)
+                received = []
+                for i in range(answers):
+                    line = await asyncio.wait_for(reader.readline(), 20)
+                    received.append((json.loads(line), time.monotonic() - started))
+                writer.close()
+                return received
+            finally:
+                listening.close()
+                server.executor.shutdown(cancel_futures = True)
+        return asyncio.run(scenario())
+
+    def testCancelWhileAllSlotsAreTaken(self):
+        long = {"program" : MUL, "inputs" : [10000000, 3]}
+        answers = self.exchange(1, [dict(long, id = 1), dict(long, id = 2), {"cancel" : 1}, {"metrics" : True}, {"cancel" : 2}], 3)
+        (metrics, elapsed) = [(answer, elapsed) for (answer, elapsed) in answers if "metrics" in answer][0]
+        self.assertLess(elapsed, 4)
+        self.assertEqual(metrics["metrics"]["running"] + metrics["metrics"]["waiting"], 2 - metrics["metrics"]["cancelled"])
+        for key in [1, 2]:
+            (answer, elapsed) = [(answer, elapsed) for (answer, elapsed) in answers if answer.get("id") == key][0]
+            self.assertEqual(answer["status"], "cancelled")
+            self.assertLess(elapsed, 4)
+
+    def testRejectWhenQueueIsFull(self):
+        long = {"program" : MUL, "inputs" : [10000000, 3]}
+        answers = self.exchange(1, [dict(long, id = 1), dict(long, id = 2), dict(long, id = 3), {"cancel" : 1}, {"cancel" : 2}], 3)
+        statuses = {answer["id"] : answer.get("status", answer.get("error")) for (answer, elapsed) in answers}
+        self.assertEqual(statuses[1], "cancelled")
+        self.assertEqual(statuses[2], "cancelled")
+        self.assertTrue(statuses[3].startswith("Server busy"))
+
+    def testResults(self):
+        answers = self.exchange(2, [{"id" : "a", "program" : "READ 1\nADD =1\n", "vectors" : [[1], [41]]}], 1)
+        self.assertEqual([result["output"] for result in answers[0][0]["results"]], [2, 42])
+
+if(__name__ == '__main__'):
+    unittest.main()